@@ -0,0 +1,5 @@
+"""Run the japanterebi-xmltv command line interface."""
+
+from japanterebi_xmltv.cli import entry
+
+entry()
@@ -0,0 +1,453 @@
+"""XML backends used to parse, edit and serialize XMLTV documents."""
+
+from __future__ import annotations
+
+import abc
+import copy
+import re
+import typing
+
+if typing.TYPE_CHECKING:
+    import pathlib
+    from xml.dom.minidom import Document
+    from xml.dom.minidom import Element as DOMElement
+    from xml.etree.ElementTree import Element as TreeElement
+
+Element = typing.TypeVar("Element")
+
+# The XML declaration written by `xml.dom.minidom`, kept by every backend so
+# that they all produce the same output (as long as the document has no
+# comments nor CDATA sections, which only `xml.dom.minidom` keeps).
+DECLARATION = b'<?xml version="1.0" encoding="utf-8"?>'
+
+# Matches the double quotes in the text nodes of a serialized element (the
+# ones in attribute values are already escaped), which `xml.dom.minidom`
+# escapes but the ElementTree libraries don't.
+TEXT_QUOTE_REGEX = re.compile(r'"(?=[^<>]*<)')
+
+
+class Backend(abc.ABC, typing.Generic[Element]):
+    """
+    The operations needed on XML documents, regardless of the library.
+
+    A backend missing one of them can't be instantiated.
+    """
+
+    name: typing.ClassVar[str]
+
+    @abc.abstractmethod
+    def parse(self, file_path: pathlib.Path) -> Element:
+        """
+        Parse a file and return its root element.
+
+        Raises
+        ------
+        ValueError
+            If the document is not well-formed.
+        """
+
+    @abc.abstractmethod
+    def parse_bytes(self, data: bytes) -> Element:
+        """
+        Parse an encoded document and return its root element.
+
+        Raises
+        ------
+        ValueError
+            If the document is not well-formed.
+        """
+
+    @abc.abstractmethod
+    def children(self, element: Element, tag: str | None = None) -> list[Element]:
+        """Get the child elements of an element, optionally with the given tag."""
+
+    @abc.abstractmethod
+    def tag(self, element: Element) -> str:
+        """Get the tag name of an element."""
+
+    @abc.abstractmethod
+    def get(self, element: Element, name: str) -> str:
+        """Get an attribute of an element, or an empty string if it's missing."""
+
+    @abc.abstractmethod
+    def attributes(self, element: Element) -> list[tuple[str, str]]:
+        """Get the attributes of an element, in document order."""
+
+    @abc.abstractmethod
+    def texts(self, element: Element) -> list[str]:
+        """Get the text nodes directly under an element."""
+
+    @abc.abstractmethod
+    def clone(self, element: Element, *, deep: bool) -> Element:
+        """Copy an element, with its children if `deep` is set."""
+
+    @abc.abstractmethod
+    def append(self, parent: Element, child: Element) -> None:
+        """Append a child element to an element."""
+
+    @abc.abstractmethod
+    def substitute(
+        self,
+        parent: Element,
+        replacements: list[tuple[Element, Element | None]],
+    ) -> None:
+        """
+        Replace or remove some children of an element.
+
+        Parameters
+        ----------
+        parent: Element
+            The parent element.
+        replacements: list
+            The children to replace, each with its new element or None to
+            remove it.
+        """
+
+    @abc.abstractmethod
+    def tostring(self, element: Element) -> str:
+        """Serialize an element."""
+
+    @abc.abstractmethod
+    def serialize(self, root: Element) -> bytes:
+        """Serialize a whole document, with its XML declaration, as UTF-8."""
+
+    def signature(
+        self,
+        element: Element,
+        normalize: typing.Callable[[str], str],
+    ) -> str:
+        """
+        Create a signature identifying the content of an element.
+
+        Based on the tag, the sorted attributes and the normalized text.
+
+        Parameters
+        ----------
+        element: Element
+            The element.
+        normalize: Callable
+            The function used to normalize each text node.
+
+        Returns
+        -------
+        str
+            The signature.
+        """
+        attrs = sorted(self.attributes(element))
+        attr_str = ",".join(f"{k}={v}" for k, v in attrs)
+        text_content = "".join(normalize(text) for text in self.texts(element))
+        return f"{self.tag(element)}|{attr_str}|{text_content}"
+
+
+class MinidomBackend(Backend["DOMElement"]):
+    """A backend using `xml.dom.minidom`, the slowest but historical one."""
+
+    name = "minidom"
+
+    def parse(self, file_path: pathlib.Path) -> DOMElement:
+        """Parse a file and return its root element."""
+        from xml.dom.minidom import parse  # noqa: PLC0415
+        from xml.parsers.expat import ExpatError  # noqa: PLC0415
+
+        with file_path.open("rb") as file:
+            try:
+                return self.root(parse(file))  # noqa: S318
+            except ExpatError as e:
+                msg = f"Couldn't parse {file_path}: {e}"
+                raise ValueError(msg) from e
+
+    def parse_bytes(self, data: bytes) -> DOMElement:
+        """Parse an encoded document and return its root element."""
+        from xml.dom.minidom import parseString  # noqa: PLC0415
+        from xml.parsers.expat import ExpatError  # noqa: PLC0415
+
+        try:
+            return self.root(parseString(data))  # noqa: S318
+        except ExpatError as e:
+            msg = f"Couldn't parse the document: {e}"
+            raise ValueError(msg) from e
+
+    @staticmethod
+    def root(dom: Document) -> DOMElement:
+        """Get the root element of a document."""
+        root: DOMElement | None = dom.documentElement
+        if not root:
+            msg = "Empty XML document"
+            raise ValueError(msg)
+        return root
+
+    def children(
+        self,
+        element: DOMElement,
+        tag: str | None = None,
+    ) -> list[DOMElement]:
+        """Get the child elements of an element, optionally with the given tag."""
+        return [
+            child
+            for child in element.childNodes
+            if child.nodeType == child.ELEMENT_NODE
+            and (tag is None or child.tagName == tag)
+        ]
+
+    def tag(self, element: DOMElement) -> str:
+        """Get the tag name of an element."""
+        return element.tagName
+
+    def get(self, element: DOMElement, name: str) -> str:
+        """Get an attribute of an element, or an empty string if it's missing."""
+        return element.getAttribute(name)
+
+    def attributes(self, element: DOMElement) -> list[tuple[str, str]]:
+        """Get the attributes of an element, in document order."""
+        return list(element.attributes.items()) if element.attributes else []
+
+    def texts(self, element: DOMElement) -> list[str]:
+        """Get the text nodes directly under an element."""
+        return [
+            child.nodeValue or ""
+            for child in element.childNodes
+            if child.nodeType == child.TEXT_NODE
+        ]
+
+    def clone(self, element: DOMElement, *, deep: bool) -> DOMElement:
+        """Copy an element, with its children if `deep` is set."""
+        cloned = element.cloneNode(deep=deep)
+        if not cloned:
+            msg = "Couldn't clone element"
+            raise ValueError(msg)
+        return cloned
+
+    def append(self, parent: DOMElement, child: DOMElement) -> None:
+        """Append a child element to an element."""
+        parent.appendChild(child)
+
+    def substitute(
+        self,
+        parent: DOMElement,
+        replacements: list[tuple[DOMElement, DOMElement | None]],
+    ) -> None:
+        """Replace or remove some children of an element."""
+        for child, replacement in replacements:
+            if replacement is None:
+                parent.removeChild(child)
+            else:
+                parent.replaceChild(replacement, child)
+
+    def tostring(self, element: DOMElement) -> str:
+        """Serialize an element."""
+        return element.toxml()
+
+    def serialize(self, root: DOMElement) -> bytes:
+        """Serialize a whole document, with its XML declaration, as UTF-8."""
+        document = root.ownerDocument
+        if not document:
+            msg = "The element is not part of a document"
+            raise ValueError(msg)
+        return document.toxml(encoding="utf-8")
+
+
+class ElementTreeBackend(Backend["TreeElement"]):
+    """A backend using `xml.etree.ElementTree` from the standard library."""
+
+    name = "etree"
+
+    def __init__(self) -> None:
+        """Import the library."""
+        super().__init__()
+        import xml.etree.ElementTree as ET  # noqa: PLC0415
+
+        self.etree = ET
+
+    def parse(self, file_path: pathlib.Path) -> TreeElement:
+        """Parse a file and return its root element."""
+        try:
+            return self.etree.parse(file_path).getroot()
+        except SyntaxError as e:
+            msg = f"Couldn't parse {file_path}: {e}"
+            raise ValueError(msg) from e
+
+    def parse_bytes(self, data: bytes) -> TreeElement:
+        """Parse an encoded document and return its root element."""
+        try:
+            return self.etree.fromstring(data)
+        except SyntaxError as e:
+            msg = f"Couldn't parse the document: {e}"
+            raise ValueError(msg) from e
+
+    def children(
+        self,
+        element: TreeElement,
+        tag: str | None = None,
+    ) -> list[TreeElement]:
+        """Get the child elements of an element, optionally with the given tag."""
+        return [
+            child
+            for child in element
+            if isinstance(child.tag, str) and (tag is None or child.tag == tag)
+        ]
+
+    def tag(self, element: TreeElement) -> str:
+        """Get the tag name of an element."""
+        return element.tag
+
+    def get(self, element: TreeElement, name: str) -> str:
+        """Get an attribute of an element, or an empty string if it's missing."""
+        return element.get(name, "")
+
+    def attributes(self, element: TreeElement) -> list[tuple[str, str]]:
+        """Get the attributes of an element, in document order."""
+        return list(element.attrib.items())
+
+    def texts(self, element: TreeElement) -> list[str]:
+        """Get the text nodes directly under an element."""
+        texts = [element.text] if element.text else []
+        texts.extend(child.tail for child in element if child.tail)
+        return texts
+
+    def clone(self, element: TreeElement, *, deep: bool) -> TreeElement:
+        """Copy an element, with its children if `deep` is set."""
+        if not deep:
+            return element.makeelement(element.tag, dict(element.attrib))
+        cloned = copy.deepcopy(element)
+        # The text following an element belongs to its parent
+        cloned.tail = None
+        return cloned
+
+    def append(self, parent: TreeElement, child: TreeElement) -> None:
+        """Append a child element to an element."""
+        parent.append(child)
+
+    def substitute(
+        self,
+        parent: TreeElement,
+        replacements: list[tuple[TreeElement, TreeElement | None]],
+    ) -> None:
+        """Replace or remove some children of an element, in a single pass."""
+        # The identity of the elements can only be compared while they are
+        # alive, which `replacements` guarantees (`lxml` creates the Python
+        # objects on access and reuses their `id` once they are freed)
+        targets = {id(child): replacement for child, replacement in replacements}
+        children: list[TreeElement] = []
+        for child in parent:
+            if id(child) not in targets:
+                children.append(child)
+                continue
+            replacement = targets[id(child)]
+            if replacement is not None:
+                replacement.tail = child.tail
+                children.append(replacement)
+            elif child.tail:
+                # Keep the text following the removed element
+                if children:
+                    children[-1].tail = (children[-1].tail or "") + child.tail
+                else:
+                    parent.text = (parent.text or "") + child.tail
+        parent[:] = children
+
+    def tostring(self, element: TreeElement) -> str:
+        """Serialize an element."""
+        result = self.write(element)
+        if '"' in result:
+            result = TEXT_QUOTE_REGEX.sub("&quot;", result)
+        return result
+
+    def write(self, element: TreeElement) -> str:
+        """Serialize an element with the library, without its tail."""
+        tail = element.tail
+        element.tail = None
+        try:
+            result = self.etree.tostring(element, encoding="unicode")
+        finally:
+            element.tail = tail
+        # Empty elements are written as `<tag />`, unlike the other backends
+        return result.replace(" />", "/>")
+
+    def serialize(self, root: TreeElement) -> bytes:
+        """Serialize a whole document, with its XML declaration, as UTF-8."""
+        return DECLARATION + self.tostring(root).encode("utf-8")
+
+
+class LxmlBackend(ElementTreeBackend):
+    """A backend using `lxml`, if it is installed."""
+
+    name = "lxml"
+
+    def __init__(self) -> None:
+        """Import the library."""
+        super().__init__()
+        from lxml import etree  # type: ignore[import-untyped]  # noqa: PLC0415
+
+        self.etree = etree
+        self.parser = etree.XMLParser(
+            remove_comments=True,
+            remove_pis=True,
+            resolve_entities=False,
+            huge_tree=True,
+        )
+
+    def parse(self, file_path: pathlib.Path) -> TreeElement:
+        """Parse a file and return its root element."""
+        try:
+            tree = self.etree.parse(str(file_path), self.parser)
+            return typing.cast("TreeElement", tree.getroot())
+        except SyntaxError as e:
+            msg = f"Couldn't parse {file_path}: {e}"
+            raise ValueError(msg) from e
+
+    def parse_bytes(self, data: bytes) -> TreeElement:
+        """Parse an encoded document and return its root element."""
+        try:
+            root = self.etree.fromstring(data, self.parser)
+            return typing.cast("TreeElement", root)
+        except SyntaxError as e:
+            msg = f"Couldn't parse the document: {e}"
+            raise ValueError(msg) from e
+
+    def write(self, element: TreeElement) -> str:
+        """Serialize an element with the library, without its tail."""
+        text = self.etree.tostring(element, encoding="unicode", with_tail=False)
+        return typing.cast("str", text)
+
+
+BACKENDS: dict[str, type[Backend[DOMElement] | Backend[TreeElement]]] = {
+    MinidomBackend.name: MinidomBackend,
+    ElementTreeBackend.name: ElementTreeBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+
+def get_backend(name: str | None = None) -> Backend[object]:
+    """
+    Get an XML backend.
+
+    Parameters
+    ----------
+    name: str | None
+        The name of the backend. By default, `lxml` is used if it is
+        installed, and `etree` otherwise.
+
+    Returns
+    -------
+    Backend
+        The backend.
+
+    Raises
+    ------
+    ValueError
+        If the backend doesn't exist or its library is not installed.
+    """
+    if name is None:
+        try:
+            return typing.cast("Backend[object]", LxmlBackend())
+        except ImportError:
+            return typing.cast("Backend[object]", ElementTreeBackend())
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        msg = f"Unknown XML backend: {name}"
+        raise ValueError(msg) from None
+    try:
+        return typing.cast("Backend[object]", backend())
+    except ImportError as e:
+        msg = f"The '{name}' XML backend is not available: {e}"
+        raise ValueError(msg) from e
@@ -0,0 +1,251 @@
+"""Bytes-level helpers to process XMLTV documents without decoding them."""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import html
+import mmap
+import os
+import pathlib
+import re
+import sys
+import tempfile
+import typing
+
+# Either a memory-mapped file or an in-memory bytes object.
+Buffer = typing.Union[bytes, mmap.mmap]
+
+# The size of the output buffer, to write the result with few large writes.
+BUFFER_SIZE = 1 << 20
+
+# A start tag, without its closing `>` or `/>`. Attribute values are matched
+# as a whole since they can contain `>`.
+START_TAG_PATTERN = rb"(<(%s)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*?)"
+
+
+@contextlib.contextmanager
+def read_mapped(file_path: pathlib.Path) -> typing.Iterator[Buffer]:
+    """
+    Memory-map a file for reading.
+
+    Parameters
+    ----------
+    file_path: Path
+        The path to the file.
+
+    Yields
+    ------
+    Buffer
+        The content of the file. Empty files, which can't be mapped, are
+        given as an empty bytes object.
+    """
+    with file_path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+@contextlib.contextmanager
+def write_atomic(
+    file_path: pathlib.Path,
+    buffer_size: int = BUFFER_SIZE,
+) -> typing.Iterator[typing.BinaryIO]:
+    """
+    Open a buffered binary output which atomically replaces a file.
+
+    The result is written to a temporary file next to `file_path`, which is
+    then renamed over it. This makes it safe to use the same file as the
+    input and the output, even when the input is memory-mapped.
+
+    Parameters
+    ----------
+    file_path: Path
+        The path to the output file. `-` writes to the standard output.
+    buffer_size: int, default = BUFFER_SIZE
+        The size of the output buffer.
+
+    Yields
+    ------
+    BinaryIO
+        The output stream.
+    """
+    if str(file_path) == "-":
+        yield sys.stdout.buffer
+        sys.stdout.buffer.flush()
+        return
+    with tempfile.NamedTemporaryFile(
+        "wb",
+        buffering=buffer_size,
+        dir=file_path.parent,
+        prefix=f".{file_path.name}.",
+        delete=False,
+    ) as output:
+        try:
+            yield typing.cast("typing.BinaryIO", output)
+        except BaseException:
+            output.close()
+            pathlib.Path(output.name).unlink()
+            raise
+    # Temporary files are only readable by their owner
+    try:
+        mode = file_path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    pathlib.Path(output.name).chmod(mode)
+    pathlib.Path(output.name).replace(file_path)
+
+
+def iter_lines(
+    data: Buffer,
+    start: int = 0,
+    end: int | None = None,
+) -> typing.Iterable[bytes]:
+    """
+    Iterate over the lines of a buffer.
+
+    Parameters
+    ----------
+    data: Buffer
+        The buffer.
+    start: int, default = 0
+        Where to start in the buffer.
+    end: int | None
+        Where to stop in the buffer, defaults to its end.
+
+    Yields
+    ------
+    bytes
+        A line, with its line ending if any.
+    """
+    if end is None:
+        end = len(data)
+    while start < end:
+        newline = data.find(b"\n", start, end)
+        stop = end if newline < 0 else newline + 1
+        yield data[start:stop]
+        start = stop
+
+
+def iter_spans_lines(
+    data: Buffer,
+    spans: typing.Iterable[tuple[int, int]],
+) -> typing.Iterable[bytes]:
+    """
+    Iterate over the lines of the concatenated spans of a buffer.
+
+    Parameters
+    ----------
+    data: Buffer
+        The buffer.
+    spans: Iterable
+        The `(start, end)` positions of the parts of the buffer to keep, in
+        order.
+
+    Yields
+    ------
+    bytes
+        A line, with its line ending if any. A line can be made of the end of
+        a span and of the beginning of the next ones.
+    """
+    rest = b""
+    for start, end in spans:
+        for line in iter_lines(data, start, end):
+            if rest:
+                line = rest + line  # noqa: PLW2901
+                rest = b""
+            if not line.endswith(b"\n"):
+                rest = line
+                continue
+            yield line
+    if rest:
+        yield rest
+
+
+def element_regex(
+    *names: bytes,
+    trailing_whitespace: bool = True,
+) -> re.Pattern[bytes]:
+    """
+    Build a regex matching the comments and the elements with the given names.
+
+    Parameters
+    ----------
+    *names: bytes
+        The names of the elements.
+    trailing_whitespace: bool, default = True
+        Whether the whitespace following an element, up to the end of its
+        line, is part of the match.
+
+    Returns
+    -------
+    Pattern
+        The regex. The first group holds the start tag of a matched element
+        (or None for a comment), and the second group its name.
+    """
+    pattern = (
+        rb"<!--.*?-->|"
+        + START_TAG_PATTERN % b"|".join(map(re.escape, names))
+        + rb"(?:/>|>.*?</\2\s*>)"
+    )
+    if trailing_whitespace:
+        pattern += rb"[ \t]*(?:\r?\n)?"
+    return re.compile(pattern, re.DOTALL)
+
+
+@functools.lru_cache(maxsize=None)
+def attribute_regex(name: bytes) -> re.Pattern[bytes]:
+    """Build a regex matching an attribute in a start tag."""
+    return re.compile(rb"\s" + re.escape(name) + rb"\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+
+
+def get_raw_attribute(start_tag: bytes, name: bytes) -> bytes | None:
+    """
+    Get the value of an attribute in a start tag, as it is written.
+
+    Parameters
+    ----------
+    start_tag: bytes
+        The start tag of an element.
+    name: bytes
+        The name of the attribute.
+
+    Returns
+    -------
+    bytes | None
+        The value, still encoded and escaped, or None if the attribute is
+        missing.
+    """
+    match = attribute_regex(name).search(start_tag)
+    if not match:
+        return None
+    value = match.group(1)
+    return match.group(2) if value is None else value
+
+
+def get_attribute(start_tag: bytes, name: bytes) -> str | None:
+    """
+    Get the value of an attribute in a start tag.
+
+    Parameters
+    ----------
+    start_tag: bytes
+        The start tag of an element.
+    name: bytes
+        The name of the attribute.
+
+    Returns
+    -------
+    str | None
+        The decoded and unescaped value, or None if the attribute is missing.
+    """
+    value = get_raw_attribute(start_tag, name)
+    if value is None:
+        return None
+    if b"&" in value:
+        return html.unescape(value.decode("utf-8"))
+    return value.decode("utf-8")
@@ -0,0 +1,205 @@
+"""Unified command line interface for the japanterebi-xmltv scripts."""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import logging
+import pathlib
+import shlex
+import sys
+import typing
+
+# The subcommands are resolved lazily so that only the modules (and their heavy
+# dependencies, such as `tqdm` or the XML libraries) needed by the invoked steps
+# are imported.
+COMMANDS: dict[str, str] = {
+    "filter": "japanterebi_xmltv.scripts.filter",
+    "fetcher": "japanterebi_xmltv.scripts.fetcher",
+    "concatenate": "japanterebi_xmltv.scripts.concatenate",
+    "fix": "japanterebi_xmltv.scripts.fix",
+    "merger": "japanterebi_xmltv.scripts.merger",
+    "minify": "japanterebi_xmltv.scripts.minify",
+    "prune": "japanterebi_xmltv.scripts.prune",
+    "restrict": "japanterebi_xmltv.scripts.restrict",
+    "shard": "japanterebi_xmltv.scripts.shard",
+    "watch": "japanterebi_xmltv.scripts.watch",
+}
+
+BATCH_COMMAND = "batch"
+
+
+def get_entry(command: str) -> typing.Callable[[list[str] | None], None]:
+    """
+    Import the entrypoint of the given subcommand.
+
+    Parameters
+    ----------
+    command: str
+        The name of the subcommand.
+
+    Returns
+    -------
+    Callable
+        The `entry` function of the subcommand module.
+
+    Raises
+    ------
+    ValueError
+        If the subcommand does not exist.
+    """
+    try:
+        module_name = COMMANDS[command]
+    except KeyError:
+        msg = f"Unknown command: {command}"
+        raise ValueError(msg) from None
+    module = importlib.import_module(module_name)
+    entry: typing.Callable[[list[str] | None], None] = module.entry
+    return entry
+
+
+def read_batch(lines: typing.Iterable[str]) -> typing.Iterable[tuple[int, list[str]]]:
+    """
+    Read the subcommand invocations from a batch file.
+
+    Each non-empty line is a subcommand followed by its arguments, split
+    using the shell syntax. Lines starting with `#` are ignored.
+
+    Parameters
+    ----------
+    lines: Iterable
+        The lines of the batch file.
+
+    Yields
+    ------
+    tuple[int, list]
+        The line number of an invocation, and its arguments, starting with
+        the subcommand name.
+
+    Raises
+    ------
+    ValueError
+        If a line can't be split, like when a quote is not closed.
+    """
+    for line_number, raw_line in enumerate(lines, start=1):
+        try:
+            arguments = shlex.split(raw_line, comments=True)
+        except ValueError as e:
+            msg = f"Line {line_number}: {e}"
+            raise ValueError(msg) from None
+        if arguments:
+            yield line_number, arguments
+
+
+def reset_logging() -> None:
+    """
+    Undo the logging configuration of a previous invocation.
+
+    The scripts configure logging with `logging.basicConfig`, which does
+    nothing once a handler is set, and disable it when writing to the
+    standard output.
+    """
+    logging.disable(logging.NOTSET)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run(arguments: list[str]) -> None:
+    """
+    Run a single subcommand invocation.
+
+    Parameters
+    ----------
+    arguments: list
+        The subcommand name followed by its arguments.
+
+    Raises
+    ------
+    ValueError
+        If the subcommand does not exist.
+    """
+    if not arguments:
+        msg = "Missing command"
+        raise ValueError(msg)
+    command, *rest = arguments
+    if command == BATCH_COMMAND:
+        msg = "Batch files can't be nested"
+        raise ValueError(msg)
+    entry = get_entry(command)
+    # The invocations of a batch file share the logging state
+    reset_logging()
+    entry(rest)
+
+
+def batch(file: typing.TextIO) -> int:
+    """
+    Run all of the subcommand invocations of a batch file in this process.
+
+    The batch stops at the first invocation which fails or exits (like with
+    an invalid argument or `--help`), after reporting its line.
+
+    Parameters
+    ----------
+    file: TextIO
+        The batch file.
+
+    Returns
+    -------
+    int
+        The number of invocations run.
+    """
+    count = 0
+    for line_number, arguments in read_batch(file):
+        try:
+            run(arguments)
+        except (Exception, SystemExit) as e:
+            reason = f"exited with status {e.code}" if isinstance(e, SystemExit) else e
+            print(  # noqa: T201
+                f"japanterebi {BATCH_COMMAND}: line {line_number} "
+                f"({shlex.join(arguments)}) stopped the batch: {reason}",
+                file=sys.stderr,
+            )
+            raise
+        count += 1
+    return count
+
+
+def entry(argv: list[str] | None = None) -> None:
+    """Entrypoint for the script."""
+    parser = argparse.ArgumentParser(
+        prog="japanterebi",
+        description="Build XMLTV guides for Japanese channels",
+    )
+    parser.add_argument(
+        "command",
+        choices=[*COMMANDS, BATCH_COMMAND],
+        help=(
+            "The step to run. "
+            f"'{BATCH_COMMAND}' runs every invocation of a batch file "
+            "(one subcommand per line, '-' for stdin)"
+        ),
+    )
+    parser.add_argument(
+        "arguments",
+        nargs=argparse.REMAINDER,
+        help="The arguments of the step",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command != BATCH_COMMAND:
+        run([args.command, *args.arguments])
+        return
+
+    if len(args.arguments) != 1:
+        parser.error(f"'{BATCH_COMMAND}' expects exactly one batch file")
+    if args.arguments[0] == "-":
+        batch(sys.stdin)
+        return
+    with pathlib.Path(args.arguments[0]).open() as file:
+        batch(file)
+
+
+if __name__ == "__main__":
+    entry()
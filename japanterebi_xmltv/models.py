@@ -36,6 +36,15 @@ class Channel:
         }
 
 
+@dataclasses.dataclass
+class ChannelFeeds:
+    """Represents the feeds selected for a TV channel."""
+
+    id: str
+    feeds: list[str]
+    has_main_feed: bool = False
+
+
 @dataclasses.dataclass
 class Feed:
     """Represents a TV channel feed."""
@@ -0,0 +1,134 @@
+"""Text normalization used to compare the content of the XMLTV elements."""
+
+from __future__ import annotations
+
+import functools
+import re
+import typing
+import unicodedata
+
+# The full-width forms of the ASCII characters, and the ideographic space.
+WIDTH_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+WIDTH_TABLE[0x3000] = ord(" ")
+
+HALF_WIDTH_KATAKANA_REGEX = re.compile("[\uff61-\uff9f]+")
+WIDTH_REGEX = re.compile("[\u3000\uff01-\uff5e\uff61-\uff9f]")
+
+DEFAULT_CACHE_SIZE = 1 << 16
+
+
+def fold_width(text: str) -> str:
+    """Convert the full-width ASCII characters and the half-width katakana."""
+    if not WIDTH_REGEX.search(text):
+        # Translating is slow on non-ASCII texts, even when nothing changes
+        return text
+    text = text.translate(WIDTH_TABLE)
+    return HALF_WIDTH_KATAKANA_REGEX.sub(
+        lambda match: unicodedata.normalize("NFKC", match.group()),
+        text,
+    )
+
+
+def collapse_whitespace(text: str) -> str:
+    """Replace each run of whitespace by a single space, and strip the text."""
+    return " ".join(text.split())
+
+
+def fold_sharp(text: str) -> str:
+    """Replace the variants of the number sign by `#`."""
+    return text.replace("\u266f", "#").replace("\uff03", "#").replace("\ufe5f", "#")
+
+
+STEPS: dict[str, typing.Callable[[str], str]] = {
+    "nfkc": functools.partial(unicodedata.normalize, "NFKC"),
+    "width": fold_width,
+    # The music sharp sign is often used instead of the number sign in the
+    # Japanese program titles
+    "sharp": fold_sharp,
+    "whitespace": collapse_whitespace,
+    "strip": str.strip,
+    "newlines": lambda text: text.replace("\n", " ").replace("\t", " "),
+    "lower": str.lower,
+}
+
+PRESETS: dict[str, tuple[str, ...]] = {
+    # The historical normalization of the merger
+    "basic": ("strip", "lower", "newlines"),
+    # NFKC already folds the character widths, `width` is only needed without it
+    "japanese": ("nfkc", "sharp", "whitespace", "lower"),
+}
+DEFAULT_PRESET = "japanese"
+
+
+class Normalizer:
+    """A memoized text normalization pipeline."""
+
+    def __init__(
+        self,
+        steps: typing.Iterable[str] = PRESETS[DEFAULT_PRESET],
+        cache_size: int | None = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        """
+        Initialize the pipeline.
+
+        Parameters
+        ----------
+        steps: Iterable, default = PRESETS[DEFAULT_PRESET]
+            The names of the steps, applied in order.
+        cache_size: int | None, default = DEFAULT_CACHE_SIZE
+            The maximum number of texts kept in the LRU cache. 0 disables the
+            cache, and None makes it unbounded.
+
+        Raises
+        ------
+        ValueError
+            If a step doesn't exist.
+        """
+        super().__init__()
+        self.steps = tuple(steps)
+        try:
+            self.functions = [STEPS[step] for step in self.steps]
+        except KeyError as e:
+            msg = f"Unknown normalization step: {e.args[0]}"
+            raise ValueError(msg) from None
+        self.normalize: typing.Callable[[str], str] = (
+            functools.lru_cache(maxsize=cache_size)(self.apply)
+            if cache_size != 0
+            else self.apply
+        )
+
+    @classmethod
+    def from_spec(cls, spec: str) -> Normalizer:
+        """
+        Create a pipeline from its command line specification.
+
+        Parameters
+        ----------
+        spec: str
+            Either the name of a preset, or comma-separated step names.
+
+        Returns
+        -------
+        Normalizer
+            The pipeline.
+
+        Raises
+        ------
+        ValueError
+            If a step doesn't exist.
+        """
+        if spec in PRESETS:
+            return cls(PRESETS[spec])
+        return cls(step.strip() for step in spec.split(",") if step.strip())
+
+    def apply(self, text: str) -> str:
+        """Normalize a text, without using the cache."""
+        for function in self.functions:
+            text = function(text)
+        return text
+
+    def __call__(self, text: str) -> str:
+        """Normalize a text."""
+        if not text:
+            return ""
+        return self.normalize(text)
@@ -0,0 +1,155 @@
+"""External sorting of records which don't fit in memory."""
+
+from __future__ import annotations
+
+import heapq
+import pathlib
+import struct
+import tempfile
+import typing
+
+# The lengths of the key and of the payload of a record.
+HEADER = struct.Struct(">II")
+
+# The estimated memory used by a buffered record, on top of its key and
+# payload (the `bytes` objects, the tuple and its slot in the list).
+RECORD_OVERHEAD = 160
+
+# The size of the read buffer of each run file while they are merged.
+READ_BUFFER_SIZE = 1 << 16
+
+# The maximum number of run files merged at once, whatever the memory budget.
+# More runs are first merged into bigger runs.
+MAX_FAN_IN = 64
+
+Record = tuple[bytes, bytes]
+
+
+def write_run(
+    directory: pathlib.Path,
+    records: typing.Iterable[Record],
+) -> pathlib.Path:
+    """
+    Write sorted records to a new run file.
+
+    Parameters
+    ----------
+    directory: Path
+        The directory of the run files.
+    records: Iterable
+        The sorted records, as `(key, payload)` tuples.
+
+    Returns
+    -------
+    Path
+        The path to the run file.
+    """
+    with tempfile.NamedTemporaryFile(
+        "wb",
+        dir=directory,
+        prefix="run.",
+        delete=False,
+    ) as file:
+        for key, payload in records:
+            file.write(HEADER.pack(len(key), len(payload)))
+            file.write(key)
+            file.write(payload)
+    return pathlib.Path(file.name)
+
+
+def read_run(file_path: pathlib.Path) -> typing.Iterator[Record]:
+    """
+    Read the records of a run file, and delete it once they are all read.
+
+    Parameters
+    ----------
+    file_path: Path
+        The path to the run file.
+
+    Yields
+    ------
+    Record
+        A `(key, payload)` tuple.
+    """
+    with file_path.open("rb", buffering=READ_BUFFER_SIZE) as file:
+        while True:
+            header = file.read(HEADER.size)
+            if not header:
+                break
+            key_size, payload_size = HEADER.unpack(header)
+            yield file.read(key_size), file.read(payload_size)
+    file_path.unlink()
+
+
+class ExternalSorter:
+    """
+    Sorts records by key using a bounded amount of memory.
+
+    The records are buffered until the memory budget is reached, then sorted
+    and written to a run file. The run files are then merged together.
+    """
+
+    def __init__(self, budget: int, directory: pathlib.Path) -> None:
+        """
+        Initialize the sorter.
+
+        Parameters
+        ----------
+        budget: int
+            The approximate number of bytes used to buffer the records, and
+            to read the run files back while they are merged.
+        directory: Path
+            The directory used to store the run files.
+        """
+        super().__init__()
+        self.budget = budget
+        self.directory = directory
+        self.fan_in = max(2, min(MAX_FAN_IN, budget // READ_BUFFER_SIZE))
+        """The number of run files merged at once, so that their read buffers
+        stay within the memory budget"""
+        self.buffer: list[Record] = []
+        self.buffered = 0
+        """The estimated memory used by the buffered records"""
+        self.runs: list[pathlib.Path] = []
+
+    def add(self, key: bytes, payload: bytes) -> None:
+        """
+        Add a record.
+
+        Parameters
+        ----------
+        key: bytes
+            The sort key of the record. Records with the same key are
+            returned in an unspecified order.
+        payload: bytes
+            The content of the record.
+        """
+        self.buffer.append((key, payload))
+        self.buffered += len(key) + len(payload) + RECORD_OVERHEAD
+        if self.buffered >= self.budget:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records to a new run file."""
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        self.runs.append(write_run(self.directory, self.buffer))
+        self.buffer = []
+        self.buffered = 0
+
+    def __iter__(self) -> typing.Iterator[Record]:
+        """Iterate over all of the records, sorted by key."""
+        if not self.runs:
+            # Everything fit in memory
+            self.buffer.sort()
+            records, self.buffer, self.buffered = self.buffer, [], 0
+            yield from records
+            return
+
+        self.flush()
+        runs, self.runs = self.runs, []
+        while len(runs) > self.fan_in:
+            merged = heapq.merge(*(read_run(run) for run in runs[: self.fan_in]))
+            runs = [*runs[self.fan_in :], write_run(self.directory, merged)]
+        yield from heapq.merge(*(read_run(run) for run in runs))
@@ -1,9 +1,14 @@
 """Concatenate XMLTV documents."""
 
+from __future__ import annotations
+
 import argparse
 import pathlib
 import typing
 
+from japanterebi_xmltv.buffers import iter_spans_lines, read_mapped, write_atomic
+from japanterebi_xmltv.scripts.restrict import load_allowed, restrict_spans
+
 
 def concatenate(files: typing.Iterable[pathlib.Path]) -> typing.Iterable[str]:
     """
@@ -41,9 +46,52 @@ def concatenate(files: typing.Iterable[pathlib.Path]) -> typing.Iterable[str]:
     yield "</tv>\n"
 
 
-def entry() -> None:
+def concatenate_bytes(
+    files: typing.Iterable[pathlib.Path],
+    allowed: set[str] | None = None,
+) -> typing.Iterable[bytes]:
+    """
+    Concatenate the XMLTV documents without decoding them.
+
+    Parameters
+    ----------
+    files: Iterable
+        The XMLTV files to concatenate.
+    allowed: set | None
+        The channel IDs to keep. The other channels and their programs are
+        dropped from each document before it is concatenated.
+
+    Yields
+    ------
+    bytes
+        A line in the concatenated document.
+    """
+    first_file = True
+    for file_path in files:
+        with read_mapped(file_path) as data:
+            # The restricted document is read in place, without copying it
+            spans = (
+                [(0, len(data))] if allowed is None else restrict_spans(data, allowed)
+            )
+            for line in iter_spans_lines(data, spans):
+                stripped = line.strip()
+                if stripped == b"</tv>":
+                    continue
+                if not first_file and (
+                    stripped.startswith((b"<?xml", b"<!DOCTYPE")) or stripped == b"<tv>"
+                ):
+                    continue
+                yield line
+        first_file = False
+    yield b"</tv>\n"
+
+
+def entry(argv: list[str] | None = None) -> None:
     """Entrypoint for the script."""
-    parser = argparse.ArgumentParser(description="Concatenate XMLTV documents")
+    parser = argparse.ArgumentParser(
+        prog="concatenate",
+        description="Concatenate XMLTV documents",
+    )
     parser.add_argument(
         "--input",
         "-i",
@@ -53,14 +101,22 @@ def entry() -> None:
         action="extend",
         required=True,
     )
+    parser.add_argument(
+        "--channels",
+        "-c",
+        type=pathlib.Path,
+        help=(
+            "Only keep the channels (and their programs) of this channels file "
+            "written by `fetcher`, or of this `filter` output"
+        ),
+    )
     parser.add_argument("output", type=pathlib.Path, help="Output file")
-    args = parser.parse_args()
-    concatenated = "".join(concatenate(args.input))
-    stdout = not (args.output and args.output != "-")
-    if stdout:
-        print(concatenated)  # noqa: T201
-    else:
-        pathlib.Path(args.output).write_text(concatenated)
+    args = parser.parse_args(argv)
+    allowed = load_allowed(args.channels) if args.channels else None
+    with write_atomic(args.output) as output:
+        output.writelines(concatenate_bytes(args.input, allowed))
+        if str(args.output) == "-":
+            output.write(b"\n")
 
 
 if __name__ == "__main__":
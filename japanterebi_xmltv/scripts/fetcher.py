@@ -1,17 +1,32 @@
 """Get the fetchers for the given channels."""
 
+from __future__ import annotations
+
 import argparse
+import contextlib
+import itertools
 import json
+import operator
 import pathlib
+import re
+import sys
 import typing
-from xml.dom.minidom import Element, parse
 
-import tqdm
+from japanterebi_xmltv.backends import get_backend
+from japanterebi_xmltv.buffers import (
+    element_regex,
+    get_attribute,
+    read_mapped,
+    write_atomic,
+)
+from japanterebi_xmltv.models import Channel, ChannelFeeds
 
-from japanterebi_xmltv.models import Channel
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.backends import Backend
+    from japanterebi_xmltv.buffers import Buffer
 
 
-def get_nodes(site: pathlib.Path) -> typing.Iterable[Element]:
+def get_nodes(site: pathlib.Path, backend: Backend[object]) -> typing.Iterable[object]:
     """
     Get the channels for the given site.
 
@@ -19,24 +34,233 @@ def get_nodes(site: pathlib.Path) -> typing.Iterable[Element]:
     ----------
     site: Path
         The path to the site.
+    backend: Backend
+        The XML backend used to parse the channels files.
 
     Returns
     -------
     Iterable
-    typing.Iterable[str]
+    typing.Iterable[Element]
+    """
+    for element in site.iterdir():
+        if element.name.endswith(".channels.xml"):
+            root = backend.parse(element)
+            yield from backend.children(root, "channel")
+
+
+# Matches the comments, to skip them, and the `channel` elements in a channels
+# file.
+CHANNEL_REGEX = element_regex(b"channel", trailing_whitespace=False)
+
+
+def get_channels_files(site: pathlib.Path) -> typing.Iterable[pathlib.Path]:
+    """
+    Get the channels files of the given site.
+
+    Parameters
+    ----------
+    site: Path
+        The path to the site.
+
+    Yields
+    ------
+    Path
+        The path to a `.channels.xml` file.
     """
     for element in site.iterdir():
         if element.name.endswith(".channels.xml"):
-            with element.open() as file:
-                dom = parse(file)  # noqa: S318
-                yield from dom.getElementsByTagName("channel")
+            yield element
+
+
+def get_raw_nodes(site: pathlib.Path) -> typing.Iterable[tuple[str, bytes]]:
+    """
+    Get the raw channels for the given site, without parsing the documents.
+
+    Parameters
+    ----------
+    site: Path
+        The path to the site.
+
+    Yields
+    ------
+    tuple[str, bytes]
+        The `xmltv_id` attribute of a `channel` element and the original
+        bytes of the element.
+    """
+    for file_path in get_channels_files(site):
+        with read_mapped(file_path) as data:
+            yield from iter_raw_channels(data)
+
+
+def iter_raw_channel_spans(data: Buffer) -> typing.Iterable[tuple[str, int, int]]:
+    """
+    Find the channels of a channels file, without parsing nor copying them.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded channels file.
+
+    Yields
+    ------
+    tuple[str, int, int]
+        The `xmltv_id` attribute of a `channel` element, and the start and
+        end positions of the element.
+    """
+    for match in CHANNEL_REGEX.finditer(data):
+        start_tag = match.group(1)
+        if start_tag is None:
+            # This is a comment
+            continue
+        xmltv_id = get_attribute(start_tag, b"xmltv_id")
+        yield xmltv_id or "", match.start(), match.end()
+
+
+def iter_raw_channels(data: Buffer) -> typing.Iterable[tuple[str, bytes]]:
+    """
+    Get the raw channels of a channels file, without parsing it.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded channels file.
+
+    Yields
+    ------
+    tuple[str, bytes]
+        The `xmltv_id` attribute of a `channel` element and the original
+        bytes of the element.
+    """
+    for xmltv_id, start, end in iter_raw_channel_spans(data):
+        yield xmltv_id, data[start:end]
+
+
+def is_selected(
+    xmltv_id: str,
+    channels_map: dict[str, Channel | ChannelFeeds],
+) -> bool:
+    """
+    Check if a channel from a site should be fetched.
+
+    Parameters
+    ----------
+    xmltv_id: str
+        The `xmltv_id` of the channel, optionally with its `@feed` suffix.
+    channels_map: dict
+        The channels to fetch, by ID.
+
+    Returns
+    -------
+    bool
+        Whether the channel and its feed are in the channels list.
+    """
+    channel_id, _, feed_id = xmltv_id.partition("@")
+    if channel_id not in channels_map:
+        return False
+    if feed_id:
+        return feed_id in channels_map[channel_id].feeds
+    return channels_map[channel_id].has_main_feed
+
+
+def get_selected_ids(
+    channels: typing.Iterable[Channel | ChannelFeeds],
+) -> typing.Iterable[str]:
+    """
+    Get every `xmltv_id` accepted by `is_selected` for the given channels.
+
+    Parameters
+    ----------
+    channels: Iterable
+        The channels to fetch.
+
+    Yields
+    ------
+    str
+        A channel ID, for its main feed, or a channel ID with its `@feed`
+        suffix.
+    """
+    for channel in channels:
+        if channel.has_main_feed:
+            yield channel.id
+        for feed in channel.feeds:
+            yield f"{channel.id}@{feed}"
+
+
+def read_channels(file: typing.TextIO) -> typing.Iterable[ChannelFeeds]:
+    """
+    Read the channels list, keeping only the fields used to select the feeds.
+
+    Parameters
+    ----------
+    file: TextIO
+        The output of `filter`, either as a JSON array or as JSON Lines.
+        JSON Lines are read lazily, one channel at a time.
+
+    Yields
+    ------
+    ChannelFeeds
+        A channel and its selected feeds.
+    """
+    first_line = file.readline()
+    if first_line.lstrip().startswith("["):
+        rows = json.loads(first_line + file.read())
+    else:
+        rows = (
+            json.loads(line)
+            for line in itertools.chain([first_line], file)
+            if line.strip()
+        )
+    for row in rows:
+        yield ChannelFeeds(
+            id=row["id"],
+            feeds=row["feeds"],
+            has_main_feed=row.get("has_main_feed", False),
+        )
+
+
+def get_sites(
+    sites: pathlib.Path,
+    *,
+    progress: bool = False,
+) -> typing.Iterable[pathlib.Path]:
+    """
+    Get the site directories to process.
+
+    Parameters
+    ----------
+    sites: Path
+        The path to the fetchers, or to a single site.
+    progress: bool, default = False
+        Whether to show a progress bar.
+
+    Yields
+    ------
+    Path
+        The path to a site.
+    """
+    import tqdm  # noqa: PLC0415
+
+    if list(sites.glob("*.channels.xml")) and list(sites.glob("*.config.js")):
+        print(f"Processing single site: {sites}", file=sys.stderr)  # noqa: T201
+        # This is a single site directory
+        yield sites
+        return
+
+    for site in tqdm.tqdm(sites.iterdir(), disable=not progress):
+        if (
+            site.is_dir()
+            and list(site.glob("*.channels.xml"))
+            and list(site.glob("*.config.js"))
+        ):
+            yield site
 
 
 def main(
     sites: pathlib.Path,
-    channels: list[Channel],
+    channels: typing.Iterable[Channel | ChannelFeeds],
     *,
     progress: bool = False,
+    backend: Backend[object] | None = None,
 ) -> typing.Iterable[str]:
     """
     Get the fetchers for the given channels.
@@ -45,54 +269,83 @@ def main(
     ----------
     sites: Path
         The path to the fetchers.
-    channels: list
-        The list of channels.
+    channels: Iterable
+        The channels to fetch.
     progress: bool, default = True
         Whether to show a progress bar.
+    backend: Backend | None
+        The XML backend used to parse the channels files.
 
     Returns
     -------
     Iterable
     typing.Iterable[pathlib.Path]
     """
+    backend = backend or get_backend()
     channels_map = {channel.id: channel for channel in channels}
+    for site in get_sites(sites, progress=progress):
+        for node in get_nodes(site, backend):
+            if is_selected(backend.get(node, "xmltv_id"), channels_map):
+                yield backend.tostring(node)
 
-    def process_site(site: pathlib.Path) -> typing.Iterable[str]:
-        for node in get_nodes(site):
-            channel_id, _, feed_id = node.getAttribute("xmltv_id").partition("@")
-            if channel_id not in channels_map:
-                continue
 
-            if feed_id:
-                if feed_id not in channels_map[channel_id].feeds:
-                    continue
-            elif not channels_map[channel_id].has_main_feed:
-                continue
+def main_raw(
+    sites: pathlib.Path,
+    channels: typing.Iterable[Channel | ChannelFeeds],
+    *,
+    progress: bool = False,
+) -> typing.Iterable[bytes]:
+    """
+    Get the fetchers for the given channels, as their original bytes.
 
-            yield node.toxml()
+    Unlike `main`, the channels files are not parsed nor re-serialized, which
+    keeps the attributes order and formatting of the matching elements.
 
-    if list(sites.glob("*.channels.xml")) and list(sites.glob("*.config.js")):
-        print(f"Processing single site: {sites}")  # noqa: T201
-        # This is a single site directory
-        yield from process_site(sites)
-        return
+    The sites are scanned before the channels are read, so that a channels
+    list piped from `filter` is written meanwhile, and then read lazily.
 
-    for site in tqdm.tqdm(sites.iterdir(), disable=not progress):
-        if (
-            site.is_dir()
-            and list(site.glob("*.channels.xml"))
-            and list(site.glob("*.config.js"))
-        ):
-            yield from process_site(site)
+    Parameters
+    ----------
+    sites: Path
+        The path to the fetchers.
+    channels: Iterable
+        The channels to fetch.
+    progress: bool, default = False
+        Whether to show a progress bar.
+
+    Yields
+    ------
+    bytes
+        A matching `channel` element, in the order of the sites.
+    """
+    # The position of every channel of the sites, by `xmltv_id`: only the
+    # selected ones are copied from their file afterwards
+    files: list[pathlib.Path] = []
+    spans: dict[str, list[tuple[int, int, int]]] = {}
+    for site in get_sites(sites, progress=progress):
+        for file_path in get_channels_files(site):
+            with read_mapped(file_path) as data:
+                for xmltv_id, start, end in iter_raw_channel_spans(data):
+                    spans.setdefault(xmltv_id, []).append((len(files), start, end))
+            files.append(file_path)
+
+    selected: list[tuple[int, int, int]] = []
+    for xmltv_id in get_selected_ids(channels):
+        selected.extend(spans.pop(xmltv_id, ()))
+    selected.sort()
+    for index, group in itertools.groupby(selected, key=operator.itemgetter(0)):
+        with read_mapped(files[index]) as data:
+            for _, start, end in group:
+                yield data[start:end]
 
 
-def entry() -> None:
+def entry(argv: list[str] | None = None) -> None:
     """Entrypoint for the script."""
     parser = argparse.ArgumentParser(prog="fetcher", description="Fetch channels")
     parser.add_argument(
         "--input",
         "-i",
-        help="The channels list",
+        help="The channels list, as JSON or JSON Lines ('-' for stdin)",
         type=pathlib.Path,
         required=True,
     )
@@ -104,21 +357,26 @@ def entry() -> None:
         required=True,
     )
     parser.add_argument("output", default="-", help="The output path", nargs="?")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     stdout = not (args.output and args.output != "-")
-    decoded = json.loads(pathlib.Path(args.input).read_text())
-    channels = [Channel(**channel) for channel in decoded]
-    sites = main(args.sites, channels, progress=not stdout)
-    result = (
-        '<?xml version="1.0" encoding="UTF-8"?>\n<channels>\n'
-        "    {channel}\n</channels>".format(
-            channel="\n    ".join(sites),
-        )
-    )
-    if stdout:
-        print(result)  # noqa: T201
-    else:
-        pathlib.Path(args.output).write_text(result)
+    with (
+        (
+            contextlib.nullcontext(sys.stdin)
+            if str(args.input) == "-"
+            else args.input.open()
+        ) as file,
+        write_atomic(pathlib.Path(args.output)) as output,
+    ):
+        output.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<channels>\n    ')
+        separator = b""
+        channels = read_channels(file)
+        for node in main_raw(args.sites, channels, progress=not stdout):
+            output.write(separator)
+            output.write(node)
+            separator = b"\n    "
+        output.write(b"\n</channels>")
+        if stdout:
+            output.write(b"\n")
 
 
 if __name__ == "__main__":
@@ -1,13 +1,15 @@
 """Filter channels from the iptv-org/database repository"""
 
+from __future__ import annotations
+
 import argparse
+import contextlib
 import datetime
 import json
 import pathlib
+import sys
 import typing
 
-import tqdm
-
 from japanterebi_xmltv.models import Channel, Feed
 
 
@@ -154,6 +156,8 @@ def main(
     Iterable
     Generator
     """
+    import tqdm  # noqa: PLC0415
+
     feeds = read_feeds_file(feeds_file)
 
     for channel in tqdm.tqdm(read_channels_file(channels_file), disable=not progress):
@@ -179,7 +183,7 @@ def main(
         yield channel
 
 
-def entry() -> None:
+def entry(argv: list[str] | None = None) -> None:
     """Entry point of the script."""
     parser = argparse.ArgumentParser(prog="filter", description="Filter channels")
     parser.add_argument("--language", help="The language of the channels", nargs="*")
@@ -200,8 +204,14 @@ def entry() -> None:
         action="store_true",
         help="Minify the JSON result",
     )
+    parser.add_argument(
+        "--jsonl",
+        "-l",
+        action="store_true",
+        help="Output JSON Lines, writing each channel as soon as it is filtered",
+    )
     parser.add_argument("output", default="-", help="The output path", nargs="?")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     stdout = not (args.output and args.output != "-")
     results = main(
         channels_file=pathlib.Path(args.channels),
@@ -213,6 +223,22 @@ def entry() -> None:
         remove=args.remove or [],
         progress=not stdout,
     )
+    if args.jsonl:
+        with (
+            contextlib.nullcontext(sys.stdout)
+            if stdout
+            else pathlib.Path(args.output).open("w")
+        ) as output:
+            for result in results:
+                encoded = json.dumps(
+                    result.as_dict,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+                output.write(f"{encoded}\n")
+                # Let a piped reader get each channel right away
+                output.flush()
+        return
     extra_args: dict[str, int | tuple[str, str]] = (
         {"separators": (",", ":")} if args.minify else {"indent": 4}
     )
@@ -1,11 +1,20 @@
 """Fixes the XMLTV document."""
 
+from __future__ import annotations
+
 import argparse
 import pathlib
 import re
+import typing
+
+from japanterebi_xmltv.buffers import read_mapped, write_atomic
+
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.buffers import Buffer
 
 # The '&' character is not escaped in some XMLTV document.
 REGEX = re.compile(r"&(?!amp;)(?!lt;)(?!gt;)(?!apos;)(?!quot;)")
+BYTES_REGEX = re.compile(REGEX.pattern.encode())
 
 
 def fix(data: str) -> str:
@@ -20,20 +29,38 @@ def fix(data: str) -> str:
     return REGEX.sub("&amp;", data)
 
 
-def entry() -> None:
+def fix_bytes(data: Buffer) -> typing.Iterable[bytes]:
+    """
+    Fix the XMLTV document without decoding it.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV document.
+
+    Yields
+    ------
+    bytes
+        A chunk of the fixed document.
+    """
+    start = 0
+    for match in BYTES_REGEX.finditer(data):
+        yield data[start : match.start()]
+        yield b"&amp;"
+        start = match.end()
+    yield data[start:]
+
+
+def entry(argv: list[str] | None = None) -> None:
     """Entrypoint of the script"""
-    parser = argparse.ArgumentParser(description="Fixes the XMLTV document")
+    parser = argparse.ArgumentParser(prog="fix", description="Fixes the XMLTV document")
     parser.add_argument("--input", "-i", type=pathlib.Path, help="Input file")
     parser.add_argument("output", type=pathlib.Path, help="Output file")
-    args = parser.parse_args()
-    with pathlib.Path(args.input).open() as file:
-        data = file.read()
-    fixed = fix(data)
-    stdout = not (args.output and args.output != "-")
-    if stdout:
-        print(fixed)  # noqa: T201
-    else:
-        pathlib.Path(args.output).write_text(fixed)
+    args = parser.parse_args(argv)
+    with read_mapped(args.input) as data, write_atomic(args.output) as output:
+        output.writelines(fix_bytes(data))
+        if str(args.output) == "-":
+            output.write(b"\n")
 
 
 if __name__ == "__main__":
@@ -3,33 +3,58 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import logging
 import pathlib
-from xml.dom.minidom import Document, Element, parse
+import tempfile
+import typing
 
-import tqdm
+from japanterebi_xmltv.backends import (
+    BACKENDS,
+    DECLARATION,
+    Backend,
+    Element,
+    get_backend,
+)
+from japanterebi_xmltv.buffers import BUFFER_SIZE, get_raw_attribute, write_atomic
+from japanterebi_xmltv.normalization import DEFAULT_PRESET, PRESETS, Normalizer
 
+# The smallest read and write buffers of the external-memory merge
+MIN_CHUNK_SIZE = 1 << 12
 
-class ChildNodes:
-    """A set of DOM elements"""
+if typing.TYPE_CHECKING:
+    import re
 
-    def __init__(self, parent: Element) -> None:
+    from japanterebi_xmltv.runs import Record
+    from japanterebi_xmltv.scripts.prune import PruneStats, TimeWindow
+
+
+# Shared by the merges, so that its cache is kept between them
+DEFAULT_NORMALIZER = Normalizer()
+
+
+class ChildNodes(typing.Generic[Element]):
+    """A set of XML elements"""
+
+    def __init__(
+        self,
+        parent: Element,
+        backend: Backend[Element],
+        normalizer: Normalizer | None = None,
+    ) -> None:
         """Initialize tracker for a parent element."""
         super().__init__()
-        cloned = parent.cloneNode(deep=False)
-        if not cloned:
-            msg = "Couldn't clone parent element"
-            raise ValueError(msg)
-        self.parent: Element = cloned
+        self.backend = backend
+        self.normalizer = normalizer or DEFAULT_NORMALIZER
+        self.parent: Element = backend.clone(parent, deep=False)
         self.seen_elements: set[str] = set()
 
-        for child in self.parent.childNodes:
-            if child.nodeType == child.ELEMENT_NODE:
-                self.add_unique_element(child)
+        for child in backend.children(parent):
+            self.add_unique_element(child)
 
     def __contains__(self, element: Element | None) -> bool:
         """Check if an element is already seen."""
-        if not element:
+        if element is None:
             return False
         signature = self.generate_signature(element)
         return signature in self.seen_elements
@@ -38,46 +63,26 @@ class ChildNodes:
         """Get the number of unique elements."""
         return len(self.seen_elements)
 
-    @classmethod
-    def normalize(cls, text: str) -> str:
+    def normalize(self, text: str) -> str:
         """Normalize text content for comparison."""
-        if not text:
-            return ""
-        return text.strip().lower().replace("\n", " ").replace("\t", " ")
+        return self.normalizer(text)
 
-    @classmethod
-    def generate_signature(cls, element: Element) -> str:
+    def generate_signature(self, element: Element) -> str:
         """
         Create a unique signature for an element.
 
         Based on tag, attributes, and text.
         """
         try:
-            tag = element.tagName
-            # Get sorted attributes for consistent comparison
-            attrs = sorted(element.attributes.items()) if element.attributes else []
-            attr_str = ",".join(f"{k}={v}" for k, v in attrs)
-
-            # Get normalized text content
-            text_content = ""
-            for child in element.childNodes:
-                if child.nodeType == child.TEXT_NODE:
-                    text_content += cls.normalize(child.nodeValue or "")
-        except AttributeError:
-            # Handle text nodes or other node types
-            if hasattr(element, "nodeValue") and element.nodeValue:
-                return f"TEXT|{cls.normalize(element.nodeValue)}"  # type: ignore[unreachable]
-            return "UNKNOWN"
+            return self.backend.signature(element, self.normalizer)
         except Exception as e:
             msg = f"Error generating signature for element: {e}"
             logging.exception(msg)
             return "ERROR"
-        else:
-            return f"{tag}|{attr_str}|{text_content}"
 
     def add_unique_element(self, element: Element | None) -> bool:
         """Add element if it's unique, return True if added."""
-        if not element:
+        if element is None:
             return False
 
         signature = self.generate_signature(element)
@@ -85,14 +90,15 @@ class ChildNodes:
             return False
 
         self.seen_elements.add(signature)
-        cloned = element.cloneNode(deep=True)
-        if not cloned:
-            return False
-        self.parent.appendChild(cloned)
+        self.backend.append(self.parent, self.backend.clone(element, deep=True))
         return True
 
 
-def merge_programs(programs: list[Element]) -> Element:
+def merge_programs(
+    programs: list[Element],
+    backend: Backend[Element],
+    normalizer: Normalizer | None = None,
+) -> Element:
     """
     Merge redundant program data from multiple program elements.
 
@@ -100,6 +106,10 @@ def merge_programs(programs: list[Element]) -> Element:
     ----------
     programs: List[Element]
         List of program elements to merge
+    backend: Backend
+        The XML backend the elements come from
+    normalizer: Normalizer | None
+        The text normalization used to compare the child elements
 
     Returns
     -------
@@ -110,29 +120,29 @@ def merge_programs(programs: list[Element]) -> Element:
         msg = "Cannot merge empty program list"
         raise ValueError(msg)
 
-    cloned = programs[0].cloneNode(deep=True)
-    if not cloned:
-        msg = "Couldn't clone the first program element"
-        raise ValueError(msg)
-    child_nodes = ChildNodes(cloned)
+    child_nodes = ChildNodes(programs[0], backend, normalizer)
 
     # Merge children from other programs
     for program in programs[1:]:
-        for child in program.childNodes:
-            if child.nodeType == child.ELEMENT_NODE:
-                child_nodes.add_unique_element(child)
+        for child in backend.children(program):
+            child_nodes.add_unique_element(child)
 
     return child_nodes.parent
 
 
-def find_duplicate_programs(dom: Document) -> dict[str, list[Element]]:
+def find_duplicate_programs(
+    root: Element,
+    backend: Backend[Element],
+) -> dict[str, list[Element]]:
     """
     Find programs with the same start time and channel.
 
     Parameters
     ----------
-    dom: Document
-        XML document to search for duplicate programs
+    root: Element
+        Root element of the XML document to search for duplicate programs
+    backend: Backend
+        The XML backend the document comes from
 
     Returns
     -------
@@ -141,13 +151,13 @@ def find_duplicate_programs(dom: Document) -> dict[str, list[Element]]:
     """
     program_groups: dict[str, list[Element]] = {}
 
-    for program in dom.getElementsByTagName("programme"):
-        start_time = program.getAttribute("start")
-        channel = program.getAttribute("channel")
+    for program in backend.children(root, "programme"):
+        start_time = backend.get(program, "start")
+        channel = backend.get(program, "channel")
 
         if not start_time or not channel:
             msg = "Program missing start time or channel"
-            msg += f": {program.toxml()[:100]}..."
+            msg += f": {backend.tostring(program)[:100]}..."
             logging.warning(msg)
             continue
 
@@ -163,29 +173,42 @@ def find_duplicate_programs(dom: Document) -> dict[str, list[Element]]:
     }
 
 
-def main(dom: Document, *, show_progress: bool = False) -> int:
+def main(
+    root: Element,
+    backend: Backend[Element],
+    *,
+    show_progress: bool = False,
+    normalizer: Normalizer | None = None,
+) -> int:
     """
     Merge duplicate programs in XMLTV document.
 
     Parameters
     ----------
-    dom: Document
-        XMLTV document to process
+    root: Element
+        Root element of the XMLTV document to process
+    backend: Backend
+        The XML backend the document comes from
     show_progress: bool, default=False
         Whether to show progress bar
+    normalizer: Normalizer | None
+        The text normalization used to compare the child elements
 
     Returns
     -------
     int
         Number of merged programs
     """
-    duplicate_groups = find_duplicate_programs(dom)
+    import tqdm  # noqa: PLC0415
+
+    duplicate_groups = find_duplicate_programs(root, backend)
 
     if not duplicate_groups:
         logging.info("No duplicate programs found")
         return 0
 
     merged_count = 0
+    replacements: list[tuple[Element, Element | None]] = []
 
     progress_iter = tqdm.tqdm(
         duplicate_groups.items(),
@@ -197,29 +220,22 @@ def main(dom: Document, *, show_progress: bool = False) -> int:
     for key, programs in progress_iter:
         try:
             # Merge all programs in the group
-            merged_program = merge_programs(programs)
-
-            for index, program in enumerate(programs):
-                if not program.parentNode:
-                    continue
-
-                # Replace first program with merged version
-                parent = program.parentNode
-                parent.replaceChild(merged_program, program)
-
-                # Remove all subsequent duplicates
-                for child in programs[index + 1 :]:
-                    if child.parentNode:
-                        parent.removeChild(child)
-                break
-
-            merged_count += len(programs) - 1
-
+            merged_program = merge_programs(programs, backend, normalizer)
         except Exception as e:
             msg = f"Error merging programs for key {key}: {e}"
             logging.exception(msg)
             continue
 
+        # Replace first program with merged version
+        replacements.append((programs[0], merged_program))
+
+        # Remove all subsequent duplicates
+        replacements.extend((program, None) for program in programs[1:])
+
+        merged_count += len(programs) - 1
+
+    backend.substitute(root, replacements)
+
     msg = (
         f"Merged {merged_count} duplicate programs into {len(duplicate_groups)} "
         "unique programs"
@@ -228,15 +244,19 @@ def main(dom: Document, *, show_progress: bool = False) -> int:
     return merged_count
 
 
-def validate_xmltv_file(file_path: pathlib.Path) -> Document:
+def validate_xmltv_file(
+    file_path: pathlib.Path,
+    backend: Backend[Element],
+) -> Element:
     """
     Validate and parse XMLTV file.
 
     Args:
         file_path: Path to XMLTV file
+        backend: XML backend used to parse the file
 
     Returns:
-        Parsed XML document
+        Root element of the parsed XML document
 
     Raises:
         FileNotFoundError: If file doesn't exist
@@ -246,22 +266,321 @@ def validate_xmltv_file(file_path: pathlib.Path) -> Document:
         msg = f"Input file not found: {file_path}"
         raise FileNotFoundError(msg)
 
-    with file_path.open("r") as f:
-        dom = parse(f)  # noqa: S318
+    root = backend.parse(file_path)
 
     # Basic XMLTV validation
-    root = dom.documentElement
-    if not root:
-        msg = f"Empty XML document: {file_path}"
-        raise ValueError(msg)
-    if root.tagName != "tv":
-        msg = f"Not a valid XMLTV file: root element is '{root.tagName}', expected 'tv'"
+    tag = backend.tag(root)
+    if tag != "tv":
+        msg = f"Not a valid XMLTV file: root element is '{tag}', expected 'tv'"
         raise ValueError(msg)
 
-    return dom
+    return root
+
+
+def get_chunk_size(budget: int) -> int:
+    """
+    Get the size of the read and write buffers of the external-memory merge.
 
+    Parameters
+    ----------
+    budget: int
+        The memory budget of the merge, in bytes.
+
+    Returns
+    -------
+    int
+        A small part of the budget, between MIN_CHUNK_SIZE and BUFFER_SIZE.
+    """
+    return max(MIN_CHUNK_SIZE, min(BUFFER_SIZE, budget // 16))
+
+
+def iter_elements(
+    file: typing.BinaryIO,
+    chunk_size: int = BUFFER_SIZE,
+) -> typing.Iterator[re.Match[bytes]]:
+    """
+    Find the `channel` and `programme` elements (and comments) of a document.
+
+    The document is read in chunks, so that only the current chunk and the
+    element being read are kept in memory.
+
+    Parameters
+    ----------
+    file: BinaryIO
+        The XMLTV document.
+    chunk_size: int, default = BUFFER_SIZE
+        The number of bytes read at once.
+
+    Yields
+    ------
+    Match
+        An element match. The text before the first one is available in its
+        `string`.
+    """
+    from japanterebi_xmltv.scripts.restrict import (  # noqa: PLC0415
+        ELEMENT_REGEX,
+        ELEMENT_START_REGEX,
+    )
+
+    buffer = b""
+    # Where the next element is searched in `buffer`
+    position = 0
+    # The chunks read since `buffer` was last scanned, and their size
+    chunks: list[bytes] = []
+    pending = 0
+    started = False
+    while True:
+        chunk = file.read(chunk_size)
+        chunks.append(chunk)
+        pending += len(chunk)
+        # Only rescan an unfinished element once its size doubled, so that
+        # an element spanning many chunks is scanned in linear time
+        if chunk and pending < len(buffer) - position:
+            continue
+        buffer = b"".join([buffer, *chunks])
+        chunks = []
+        pending = 0
+
+        while True:
+            start = ELEMENT_START_REGEX.search(buffer, position)
+            if start is None:
+                # The end of the buffer might be the beginning of an element
+                position = max(position, len(buffer) - len(b"<programme"))
+                break
+            match = ELEMENT_REGEX.match(buffer, start.start())
+            if chunk and (match is None or match.end() == len(buffer)):
+                # The element (or the whitespace after it) might continue in
+                # the next chunk, nothing after its start can be matched
+                position = start.start()
+                break
+            if match is None:
+                # Not a well-formed element, like `re.finditer` would do
+                position = start.end()
+                continue
+            yield match
+            started = True
+            position = match.end()
+
+        if not chunk:
+            return
+        if started:
+            # The text before the first element is kept for its `string`
+            buffer = buffer[position:]
+            position = 0
+
+
+def merge_sorted(
+    programs: typing.Iterable[Record],
+    backend: Backend[Element],
+    normalizer: Normalizer | None = None,
+) -> typing.Iterable[tuple[bytes, bytes, int]]:
+    """
+    Merge the duplicate programs of a sorted stream of programs.
+
+    Parameters
+    ----------
+    programs: Iterable
+        The encoded programs, keyed by their channel, start time and position
+        (as the last 8 bytes), sorted by key.
+    backend: Backend
+        The XML backend used to merge the duplicate programs.
+    normalizer: Normalizer | None
+        The text normalization used to compare the child elements.
+
+    Yields
+    ------
+    tuple[bytes, bytes, int]
+        The position of the first program of a group of duplicates, the
+        encoded merged program, and the number of duplicates merged into it.
+    """
+    group: list[Record] = []
+    for record in itertools.chain(programs, [(b"", b"")]):
+        if group and record[0][:-8] != group[0][0][:-8]:
+            position, element = group[0][0][-8:], group[0][1]
+            if len(group) > 1:
+                parsed = [backend.parse_bytes(program) for _, program in group]
+                merged = merge_programs(parsed, backend, normalizer)
+                element = backend.tostring(merged).encode()
+            yield position, element, len(group) - 1
+            group = []
+        group.append(record)
+
+
+def merge_external(
+    file: typing.BinaryIO,
+    output: typing.BinaryIO,
+    backend: Backend[Element],
+    *,
+    budget: int,
+    directory: pathlib.Path | None = None,
+    window: TimeWindow | None = None,
+    stats: PruneStats | None = None,
+    normalizer: Normalizer | None = None,
+) -> tuple[int, int]:
+    """
+    Merge duplicate programs with a bounded amount of memory.
 
-def entry() -> None:
+    The programs are sorted by channel and start time in run files on disk,
+    which are merged back to find the duplicate programs. The merged programs
+    are then put back in their original order, using a second external sort.
+    Only the duplicate programs are parsed.
+
+    Parameters
+    ----------
+    file: BinaryIO
+        The XMLTV document to process.
+    output: BinaryIO
+        The output stream.
+    backend: Backend
+        The XML backend used to merge the duplicate programs.
+    budget: int
+        The approximate number of bytes used to buffer the programs, the
+        input and the output (see `get_chunk_size`).
+    directory: Path | None
+        The directory in which the run files are stored.
+    window: TimeWindow | None
+        If given, the programs out of this time range are dropped.
+    stats: PruneStats | None
+        Updated with the dropped programs, if given.
+    normalizer: Normalizer | None
+        The text normalization used to compare the child elements.
+
+    Returns
+    -------
+    tuple[int, int]
+        The number of programs read, and the number of merged programs.
+
+    Raises
+    ------
+    ValueError
+        If not a valid XMLTV file
+    """
+    from japanterebi_xmltv.runs import ExternalSorter  # noqa: PLC0415
+    from japanterebi_xmltv.scripts.restrict import (  # noqa: PLC0415
+        TV_REGEX,
+        get_channel_id,
+    )
+
+    count = 0
+    merged_count = 0
+    header = None
+    chunk_size = get_chunk_size(budget)
+    # What is left once the input and output buffers are accounted for
+    budget = max(0, budget - 2 * chunk_size)
+    with tempfile.TemporaryDirectory(prefix=".merger.", dir=directory) as runs:
+        # The programs, grouped by channel and start time
+        programs = ExternalSorter(budget // 2, pathlib.Path(runs))
+        # Every element of the merged guide, by position in the original one
+        elements = ExternalSorter(budget // 2, pathlib.Path(runs))
+
+        for position, match in enumerate(iter_elements(file, chunk_size)):
+            start_tag = match.group(1)
+            if start_tag is None:
+                # This is a comment
+                continue
+            if header is None:
+                root = TV_REGEX.search(match.string, 0, match.start())
+                if not root:
+                    msg = "Not a valid XMLTV file: missing the 'tv' element"
+                    raise ValueError(msg)
+                header = DECLARATION + root.group() + b"\n"
+            element = match.group().rstrip()
+            key = position.to_bytes(8, "big")
+            if match.group(2) == b"channel":
+                elements.add(key, element)
+                continue
+
+            count += 1
+            start_time = get_raw_attribute(start_tag, b"start")
+            stop_time = get_raw_attribute(start_tag, b"stop")
+            if window and not window.keeps(
+                start_time.decode("latin-1") if start_time else None,
+                None if stop_time is None else stop_time.decode("latin-1"),
+            ):
+                if stats is not None:
+                    stats.programs += 1
+                    stats.bytes += match.end() - match.start()
+                continue
+            channel = get_channel_id(b"programme", start_tag)
+            if not start_time or not channel:
+                msg = f"Program missing start time or channel: {element[:100]!r}..."
+                logging.warning(msg)
+                elements.add(key, element)
+                continue
+            programs.add(b"\0".join([channel.encode(), start_time, key]), element)
+
+        if header is None:
+            msg = "Not a valid XMLTV file: no channel nor program found"
+            raise ValueError(msg)
+
+        for key, element, duplicates in merge_sorted(
+            programs,
+            backend,
+            normalizer,
+        ):
+            elements.add(key, element)
+            merged_count += duplicates
+
+        output.write(header)
+        for _, element in elements:
+            output.write(element)
+            output.write(b"\n")
+        output.write(b"</tv>")
+    return count, merged_count
+
+
+def merge_with_budget(
+    args: argparse.Namespace,
+    backend: Backend[object],
+    window: TimeWindow | None,
+    normalizer: Normalizer,
+) -> None:
+    """Run the external-memory merge mode of the entrypoint."""
+    from japanterebi_xmltv.scripts.prune import PruneStats  # noqa: PLC0415
+
+    stdout = str(args.output) == "-"
+    if not args.input.exists():
+        msg = f"Input file not found: {args.input}"
+        raise FileNotFoundError(msg)
+
+    stats = PruneStats()
+    budget = int(args.memory_budget * (1 << 20))
+    output_context = write_atomic(args.output, get_chunk_size(budget))
+    with args.input.open("rb", buffering=0) as file, output_context as output:
+        initial_count, merged_count = merge_external(
+            file,
+            output,
+            backend,
+            budget=budget,
+            directory=None if stdout else args.output.resolve().parent,
+            window=window,
+            stats=stats,
+            normalizer=normalizer,
+        )
+        if stdout:
+            output.write(b"\n")
+
+    if window:
+        msg = f"Pruned {stats.programs} programs ({stats.bytes} bytes)"
+        logging.info(msg)
+    final_count = initial_count - stats.programs - merged_count
+    msg = f"Saved merged XMLTV to: {args.output}"
+    logging.info(msg)
+    msg = f"Initial program count: {initial_count}"
+    logging.info(msg)
+    msg = f"Final program count: {final_count} (removed {merged_count} duplicates)"
+    logging.info(msg)
+
+
+def parse_normalizer(spec: str) -> Normalizer:
+    """Create the text normalization given to the `--normalize` option."""
+    try:
+        return Normalizer.from_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def entry(argv: list[str] | None = None) -> None:
     """Entrypoint for the script."""
     parser = argparse.ArgumentParser(
         prog="xmltv-merger",
@@ -298,9 +617,51 @@ def entry() -> None:
         action="store_true",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--backend",
+        help="XML backend (defaults to 'lxml' if it is installed, 'etree' otherwise)",
+        choices=list(BACKENDS),
+    )
+
+    parser.add_argument(
+        "--past",
+        help="Drop the programs which ended more than this many hours ago",
+        type=float,
+        metavar="HOURS",
+    )
+
+    parser.add_argument(
+        "--future",
+        help="Drop the programs which start more than this many days ahead",
+        type=float,
+        metavar="DAYS",
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        help=(
+            "Merge the programs using sorted run files on disk, buffering at "
+            "most about this many MiB of programs (for guides larger than RAM)"
+        ),
+        type=float,
+        metavar="MIB",
+    )
+
+    parser.add_argument(
+        "--normalize",
+        help=(
+            "Text normalization used to find the duplicate child elements: "
+            f"a preset ({', '.join(PRESETS)}) or comma-separated steps "
+            "(nfkc, width, sharp, whitespace, strip, newlines, lower)"
+        ),
+        type=parse_normalizer,
+        default=DEFAULT_PRESET,
+        metavar="STEPS",
+    )
+
+    args = parser.parse_args(argv)
 
-    stdout = not (args.output and args.output != "-")
+    stdout = str(args.output) == "-"
 
     logging.basicConfig(
         level=logging.DEBUG if args.verbose else logging.INFO,
@@ -311,27 +672,60 @@ def entry() -> None:
     if stdout:
         logging.disable()
 
+    # Prune the programs out of the time window before merging them
+    window = None
+    if args.past is not None or args.future is not None:
+        import datetime  # noqa: PLC0415
+
+        from japanterebi_xmltv.scripts.prune import TimeWindow  # noqa: PLC0415
+
+        window = TimeWindow.around(
+            datetime.datetime.now(datetime.timezone.utc),
+            args.past,
+            args.future,
+        )
+
     # Parse and validate input file
     msg = f"Loading XMLTV file: {args.input}"
     logging.info(msg)
-    dom = validate_xmltv_file(args.input)
+    backend = get_backend(args.backend)
+    msg = f"Using the '{backend.name}' XML backend"
+    logging.debug(msg)
+
+    if args.memory_budget is not None:
+        merge_with_budget(args, backend, window, args.normalize)
+        return
+
+    root = validate_xmltv_file(args.input, backend)
 
     # Count initial programs
-    initial_count = len(dom.getElementsByTagName("programme"))
+    initial_count = len(backend.children(root, "programme"))
     msg = f"Found {initial_count} programs in input file"
     logging.info(msg)
 
+    if window:
+        from japanterebi_xmltv.scripts.prune import prune_document  # noqa: PLC0415
+
+        stats = prune_document(root, backend, window)
+        msg = f"Pruned {stats.programs} programs ({stats.bytes} bytes)"
+        logging.info(msg)
+
     # Merge duplicate programs
-    merged_count = main(dom, show_progress=not stdout and not args.no_progress)
+    merged_count = main(
+        root,
+        backend,
+        show_progress=not stdout and not args.no_progress,
+        normalizer=args.normalize,
+    )
 
     # Generate output
-    result = dom.toxml(encoding="utf-8").decode("utf-8")
+    with write_atomic(args.output) as output:
+        output.write(backend.serialize(root))
+        if stdout:
+            output.write(b"\n")
 
-    if stdout:
-        print(result)  # noqa: T201
-    else:
-        pathlib.Path(args.output).write_text(result)
-        final_count = len(dom.getElementsByTagName("programme"))
+    if not stdout:
+        final_count = len(backend.children(root, "programme"))
         msg = f"Saved merged XMLTV to: {args.output}"
         logging.info(msg)
         msg = f"Initial program count: {initial_count}"
@@ -1,9 +1,21 @@
 """Minifies the XMLTV document."""
 
+from __future__ import annotations
+
 import argparse
 import pathlib
 import typing
 
+from japanterebi_xmltv.buffers import iter_lines, read_mapped, write_atomic
+
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.buffers import Buffer
+
+# The bytes found at the edges of a line which starts or ends with whitespace
+# that `str.strip` strips but `bytes.strip` doesn't: the `\x1c` to `\x1f`
+# separators, and the bytes of the non-ASCII characters (like U+3000)
+UNICODE_WHITESPACE_BYTES = frozenset(range(0x1C, 0x20)) | frozenset(range(0x80, 0x100))
+
 
 def minify(data: str) -> typing.Iterable[str]:
     """
@@ -20,20 +32,60 @@ def minify(data: str) -> typing.Iterable[str]:
             yield line
 
 
-def entry() -> None:
+def strip_line(line: bytes) -> bytes:
+    """
+    Strip the whitespace around an encoded line, like `str.strip` would.
+
+    `bytes.strip` only strips the ASCII whitespace, so the lines which start
+    or end with other characters, like the ideographic space (U+3000) often
+    found in Japanese text, are decoded to be stripped.
+    """
+    line = line.strip()
+    if line and (
+        line[0] in UNICODE_WHITESPACE_BYTES or line[-1] in UNICODE_WHITESPACE_BYTES
+    ):
+        text = line.decode("utf-8", "surrogateescape").strip()
+        return text.encode("utf-8", "surrogateescape")
+    return line
+
+
+def minify_bytes(data: Buffer) -> typing.Iterable[bytes]:
+    """
+    Minify the XMLTV document without decoding it.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV document.
+
+    Yields
+    ------
+    bytes
+        A line in the minified document, without its line ending.
+    """
+    for raw_line in iter_lines(data):
+        line = strip_line(raw_line)
+        if line:
+            yield line
+
+
+def entry(argv: list[str] | None = None) -> None:
     """Entrypoint for the script."""
-    parser = argparse.ArgumentParser(description="Minify the XMLTV document")
+    parser = argparse.ArgumentParser(
+        prog="minify",
+        description="Minify the XMLTV document",
+    )
     parser.add_argument("--input", "-i", type=pathlib.Path, help="Input file")
     parser.add_argument("output", type=pathlib.Path, help="Output file")
-    args = parser.parse_args()
-    with pathlib.Path(args.input).open() as file:
-        data = file.read()
-    minified = "\n".join(minify(data))
-    stdout = not (args.output and args.output != "-")
-    if stdout:
-        print(minified)  # noqa: T201
-    else:
-        pathlib.Path(args.output).write_text(minified)
+    args = parser.parse_args(argv)
+    with read_mapped(args.input) as data, write_atomic(args.output) as output:
+        separator = b""
+        for line in minify_bytes(data):
+            output.write(separator)
+            output.write(line)
+            separator = b"\n"
+        if str(args.output) == "-":
+            output.write(b"\n")
 
 
 if __name__ == "__main__":
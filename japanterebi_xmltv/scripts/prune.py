@@ -0,0 +1,281 @@
+"""Prunes the expired and far-future programs of an XMLTV document."""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime
+import functools
+import logging
+import pathlib
+import re
+import typing
+
+from japanterebi_xmltv.buffers import (
+    element_regex,
+    get_raw_attribute,
+    read_mapped,
+    write_atomic,
+)
+
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.backends import Backend, Element
+    from japanterebi_xmltv.buffers import Buffer
+
+DEFAULT_PAST_HOURS = 6
+DEFAULT_FUTURE_DAYS = 14
+
+# Matches the comments, to keep them as is, and the `programme` elements with
+# the whitespace up to the end of their line.
+PROGRAMME_REGEX = element_regex(b"programme")
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def parse_time(value: str) -> float | None:
+    """
+    Parse an XMLTV date.
+
+    The same dates are repeated a lot in a guide (every channel has a program
+    starting at the top of the hour), so the results are cached.
+
+    Parameters
+    ----------
+    value: str
+        The date, in the `YYYYMMDDhhmmss +zzzz` format. The seconds, minutes
+        and hours, as well as the timezone offset, are optional.
+
+    Returns
+    -------
+    float | None
+        The POSIX timestamp of the date, or None if it couldn't be parsed.
+    """
+    digits, _, offset = value.strip().partition(" ")
+    if len(digits) < 8 or not digits.isdigit():  # noqa: PLR2004
+        return None
+    digits = digits[:14].ljust(14, "0")
+    try:
+        moment = datetime.datetime(
+            int(digits[0:4]),
+            int(digits[4:6]),
+            int(digits[6:8]),
+            int(digits[8:10]),
+            int(digits[10:12]),
+            int(digits[12:14]),
+            tzinfo=datetime.timezone.utc,
+        )
+    except ValueError:
+        return None
+    timestamp = moment.timestamp()
+    if len(offset) == 5 and offset[0] in "+-" and offset[1:].isdigit():  # noqa: PLR2004
+        sign = -1 if offset[0] == "-" else 1
+        timestamp -= sign * (int(offset[1:3]) * 3600 + int(offset[3:5]) * 60)
+    return timestamp
+
+
+@dataclasses.dataclass
+class TimeWindow:
+    """The time range of the programs to keep."""
+
+    start: float | None = None
+    """Programs which ended before this timestamp are dropped"""
+    end: float | None = None
+    """Programs which start after this timestamp are dropped"""
+
+    @classmethod
+    def around(
+        cls,
+        now: datetime.datetime,
+        past: float | None = DEFAULT_PAST_HOURS,
+        future: float | None = DEFAULT_FUTURE_DAYS,
+    ) -> TimeWindow:
+        """
+        Create a time window around a date.
+
+        Parameters
+        ----------
+        now: datetime
+            The current date.
+        past: float | None, default = DEFAULT_PAST_HOURS
+            The number of hours to keep the programs for after they ended.
+            None keeps all of the past programs.
+        future: float | None, default = DEFAULT_FUTURE_DAYS
+            The number of days ahead to keep the programs for.
+            None keeps all of the future programs.
+
+        Returns
+        -------
+        TimeWindow
+            The time window.
+        """
+        timestamp = now.timestamp()
+        return cls(
+            start=None if past is None else timestamp - past * 3600,
+            end=None if future is None else timestamp + future * 86400,
+        )
+
+    def keeps(self, start: str | None, stop: str | None) -> bool:
+        """
+        Check if a program is in the time window.
+
+        Programs with missing or invalid dates are kept.
+
+        Parameters
+        ----------
+        start: str | None
+            The `start` attribute of the program.
+        stop: str | None
+            The `stop` attribute of the program.
+
+        Returns
+        -------
+        bool
+            Whether the program should be kept.
+        """
+        start_time = parse_time(start) if start else None
+        if self.end is not None and start_time is not None and start_time > self.end:
+            return False
+        if self.start is None:
+            return True
+        # Programs without an end are considered to end when they start
+        stop_time = parse_time(stop) if stop else start_time
+        return stop_time is None or stop_time >= self.start
+
+
+@dataclasses.dataclass
+class PruneStats:
+    """Statistics about the pruned programs."""
+
+    programs: int = 0
+    """The number of programs dropped"""
+    bytes: int = 0
+    """The number of bytes saved"""
+
+
+def prune_bytes(
+    data: Buffer,
+    window: TimeWindow,
+    stats: PruneStats | None = None,
+) -> typing.Iterable[bytes]:
+    """
+    Prune an XMLTV document without parsing nor decoding it.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV document.
+    window: TimeWindow
+        The time range of the programs to keep.
+    stats: PruneStats | None
+        Updated with the dropped programs, if given.
+
+    Yields
+    ------
+    bytes
+        A chunk of the pruned document.
+    """
+    start = 0
+    for match in PROGRAMME_REGEX.finditer(data):
+        start_tag = match.group(1)
+        if start_tag is None:
+            # This is a comment
+            continue
+        program_start = get_raw_attribute(start_tag, b"start")
+        program_stop = get_raw_attribute(start_tag, b"stop")
+        if window.keeps(
+            program_start.decode("latin-1") if program_start else None,
+            program_stop.decode("latin-1") if program_stop else None,
+        ):
+            continue
+        yield data[start : match.start()]
+        start = match.end()
+        if stats is not None:
+            stats.programs += 1
+            stats.bytes += match.end() - match.start()
+    yield data[start:]
+
+
+def prune_document(
+    root: Element,
+    backend: Backend[Element],
+    window: TimeWindow,
+) -> PruneStats:
+    """
+    Prune a parsed XMLTV document in place.
+
+    Parameters
+    ----------
+    root: Element
+        The root element of the XMLTV document.
+    backend: Backend
+        The XML backend the document comes from.
+    window: TimeWindow
+        The time range of the programs to keep.
+
+    Returns
+    -------
+    PruneStats
+        The dropped programs.
+    """
+    stats = PruneStats()
+    removed: list[tuple[Element, Element | None]] = []
+    for program in backend.children(root, "programme"):
+        if window.keeps(backend.get(program, "start"), backend.get(program, "stop")):
+            continue
+        stats.programs += 1
+        stats.bytes += len(backend.tostring(program).encode())
+        removed.append((program, None))
+    backend.substitute(root, removed)
+    return stats
+
+
+def entry(argv: list[str] | None = None) -> None:
+    """Entrypoint for the script."""
+    parser = argparse.ArgumentParser(
+        prog="prune",
+        description="Prune the expired and far-future programs",
+    )
+    parser.add_argument("--input", "-i", type=pathlib.Path, help="Input file")
+    parser.add_argument(
+        "--past",
+        type=float,
+        default=DEFAULT_PAST_HOURS,
+        help="Drop the programs which ended more than this many hours ago",
+    )
+    parser.add_argument(
+        "--future",
+        type=float,
+        default=DEFAULT_FUTURE_DAYS,
+        help="Drop the programs which start more than this many days ahead",
+    )
+    parser.add_argument(
+        "--now",
+        type=datetime.datetime.fromisoformat,
+        help="The current date, as an ISO 8601 date (defaults to now)",
+    )
+    parser.add_argument("output", type=pathlib.Path, help="Output file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    if str(args.output) == "-":
+        logging.disable()
+
+    now = args.now or datetime.datetime.now(datetime.timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=datetime.timezone.utc)
+    window = TimeWindow.around(now, args.past, args.future)
+    stats = PruneStats()
+    with read_mapped(args.input) as data, write_atomic(args.output) as output:
+        output.writelines(prune_bytes(data, window, stats))
+        if str(args.output) == "-":
+            output.write(b"\n")
+
+    msg = f"Pruned {stats.programs} programs ({stats.bytes} bytes)"
+    logging.info(msg)
+
+
+if __name__ == "__main__":
+    entry()
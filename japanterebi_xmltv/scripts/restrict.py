@@ -0,0 +1,208 @@
+"""Drops the channels and programs of an XMLTV document which were not selected."""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import logging
+import pathlib
+import re
+import typing
+
+from japanterebi_xmltv.buffers import (
+    element_regex,
+    get_attribute,
+    read_mapped,
+    write_atomic,
+)
+
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.buffers import Buffer
+
+# Matches the comments, to keep them as is, and the `channel` and `programme`
+# elements with the whitespace up to the end of their line.
+ELEMENT_REGEX = element_regex(b"channel", b"programme")
+# Matches the beginning of the comments and elements matched by ELEMENT_REGEX
+ELEMENT_START_REGEX = re.compile(rb"<!--|<(?:channel|programme)\b")
+# Matches the start tag of the root `tv` element
+TV_REGEX = re.compile(rb"<tv\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>")
+# The attribute holding the channel ID of each element
+ID_ATTRIBUTES = {b"channel": b"id", b"programme": b"channel"}
+
+
+def load_allowed(file_path: pathlib.Path) -> set[str]:
+    """
+    Load the channel IDs to keep.
+
+    Parameters
+    ----------
+    file_path: Path
+        Either a channels file written by `fetcher` (every `xmltv_id` it
+        contains is kept), or the channels list written by `filter`, as JSON
+        or JSON Lines (the channels and feeds it selects are kept, like
+        `fetcher` does).
+
+    Returns
+    -------
+    set
+        The channel IDs, with their `@feed` suffix for the non-main feeds.
+    """
+    from japanterebi_xmltv.scripts.fetcher import (  # noqa: PLC0415
+        get_selected_ids,
+        iter_raw_channels,
+        read_channels,
+    )
+
+    with read_mapped(file_path) as data:
+        if data[:64].lstrip().startswith(b"<"):
+            return {xmltv_id for xmltv_id, _ in iter_raw_channels(data) if xmltv_id}
+    with file_path.open() as file:
+        return set(get_selected_ids(read_channels(file)))
+
+
+@dataclasses.dataclass
+class RestrictStats:
+    """Statistics about the dropped elements."""
+
+    channels: int = 0
+    """The number of channels dropped"""
+    programs: int = 0
+    """The number of programs dropped"""
+    bytes: int = 0
+    """The number of bytes saved"""
+
+
+def get_channel_id(element: bytes, start_tag: bytes) -> str | None:
+    """
+    Get the channel ID of a `channel` or `programme` element.
+
+    Parameters
+    ----------
+    element: bytes
+        The name of the element.
+    start_tag: bytes
+        The start tag of the element.
+
+    Returns
+    -------
+    str | None
+        The channel ID, or None if the element doesn't have one.
+    """
+    return get_attribute(start_tag, ID_ATTRIBUTES[element])
+
+
+def restrict_spans(
+    data: Buffer,
+    allowed: set[str],
+    stats: RestrictStats | None = None,
+) -> typing.Iterable[tuple[int, int]]:
+    """
+    Find the parts of a document to keep, without parsing nor copying it.
+
+    The channels and programs which are not allowed are dropped, and the
+    document is not decoded either. Elements without a channel ID are kept.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV document.
+    allowed: set
+        The channel IDs to keep.
+    stats: RestrictStats | None
+        Updated with the dropped elements, if given.
+
+    Yields
+    ------
+    tuple[int, int]
+        The `(start, end)` positions of a part of the document to keep.
+    """
+    start = 0
+    for match in ELEMENT_REGEX.finditer(data):
+        start_tag = match.group(1)
+        if start_tag is None:
+            # This is a comment
+            continue
+        element = match.group(2)
+        channel_id = get_channel_id(element, start_tag)
+        if channel_id is None or channel_id in allowed:
+            continue
+        yield start, match.start()
+        start = match.end()
+        if stats is not None:
+            if element == b"channel":
+                stats.channels += 1
+            else:
+                stats.programs += 1
+            stats.bytes += match.end() - match.start()
+    yield start, len(data)
+
+
+def restrict_bytes(
+    data: Buffer,
+    allowed: set[str],
+    stats: RestrictStats | None = None,
+) -> typing.Iterable[bytes]:
+    """
+    Drop the channels and programs which are not allowed, without parsing.
+
+    The document is not decoded either. Elements without a channel ID are kept.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV document.
+    allowed: set
+        The channel IDs to keep.
+    stats: RestrictStats | None
+        Updated with the dropped elements, if given.
+
+    Yields
+    ------
+    bytes
+        A chunk of the restricted document.
+    """
+    for start, end in restrict_spans(data, allowed, stats):
+        yield data[start:end]
+
+
+def entry(argv: list[str] | None = None) -> None:
+    """Entrypoint for the script."""
+    parser = argparse.ArgumentParser(
+        prog="restrict",
+        description="Drop the channels and programs which were not selected",
+    )
+    parser.add_argument("--input", "-i", type=pathlib.Path, help="Input file")
+    parser.add_argument(
+        "--channels",
+        "-c",
+        type=pathlib.Path,
+        help="The channels file written by `fetcher`, or the `filter` output",
+        required=True,
+    )
+    parser.add_argument("output", type=pathlib.Path, help="Output file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    if str(args.output) == "-":
+        logging.disable()
+
+    allowed = load_allowed(args.channels)
+    stats = RestrictStats()
+    with read_mapped(args.input) as data, write_atomic(args.output) as output:
+        output.writelines(restrict_bytes(data, allowed, stats))
+        if str(args.output) == "-":
+            output.write(b"\n")
+
+    msg = (
+        f"Dropped {stats.channels} channels and {stats.programs} programs "
+        f"({stats.bytes} bytes)"
+    )
+    logging.info(msg)
+
+
+if __name__ == "__main__":
+    entry()
@@ -0,0 +1,325 @@
+"""Splits an XMLTV guide into a guide per channel and per provider."""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import functools
+import hashlib
+import json
+import logging
+import pathlib
+import typing
+import urllib.parse
+
+from japanterebi_xmltv.buffers import read_mapped, write_atomic
+from japanterebi_xmltv.scripts.restrict import (
+    ELEMENT_REGEX,
+    TV_REGEX,
+    get_channel_id,
+    load_allowed,
+)
+
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.buffers import Buffer
+
+MANIFEST = "manifest.json"
+GUIDE = "guide.xml"
+
+
+@dataclasses.dataclass
+class Shard:
+    """The content of a guide being built."""
+
+    spans: list[tuple[int, int]] = dataclasses.field(default_factory=list)
+    """The positions of the `channel` and `programme` elements in the
+    combined guide, in document order"""
+
+    def iter_pieces(self, data: Buffer, header: bytes) -> typing.Iterable[bytes]:
+        """
+        Get the whole XMLTV document, piece by piece.
+
+        Parameters
+        ----------
+        data: Buffer
+            The encoded combined guide.
+        header: bytes
+            The XML declaration and the `tv` start tag.
+
+        Yields
+        ------
+        bytes
+            A part of the encoded document.
+        """
+        yield header
+        for start, end in self.spans:
+            yield data[start:end] + b"\n"
+        yield b"</tv>"
+
+
+def get_provider_name(file_path: pathlib.Path) -> str:
+    """
+    Get the name of a provider from its channels file.
+
+    Parameters
+    ----------
+    file_path: Path
+        The channels file, named like `japanterebi@<provider>.channels.xml`.
+
+    Returns
+    -------
+    str
+        The name of the provider.
+    """
+    return file_path.name.removesuffix(".channels.xml").rpartition("@")[2]
+
+
+def get_shard_path(directory: str, name: str) -> str:
+    """
+    Get the path of a shard, relative to the output directory.
+
+    Parameters
+    ----------
+    directory: str
+        The kind of shard, `channels` or `providers`, which is also its
+        directory.
+    name: str
+        The channel ID or the provider name.
+
+    Returns
+    -------
+    str
+        The relative path, with the name escaped to be a safe file name.
+    """
+    return f"{directory}/{urllib.parse.quote(name, safe='@')}.xml"
+
+
+def split_guide(
+    data: Buffer,
+    providers: dict[str, set[str]],
+) -> tuple[bytes, dict[str, Shard], dict[str, Shard]]:
+    """
+    Split a guide in a single pass, without parsing nor decoding it.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV guide.
+    providers: dict
+        The channel IDs of each provider.
+
+    Returns
+    -------
+    tuple[bytes, dict, dict]
+        The XML declaration and `tv` start tag of the guide, the shard of each
+        channel and the shard of each provider.
+    """
+    root = TV_REGEX.search(data)
+    if not root:
+        msg = "Not a valid XMLTV file: missing the `tv` element"
+        raise ValueError(msg)
+    header = data[: root.end()] + b"\n"
+
+    # The providers of each channel
+    channel_providers: dict[str, list[Shard]] = {}
+    provider_shards = {name: Shard() for name in providers}
+    for name, channel_ids in providers.items():
+        for channel_id in channel_ids:
+            channel_providers.setdefault(channel_id, []).append(provider_shards[name])
+
+    channel_shards: dict[str, Shard] = {}
+    for match in ELEMENT_REGEX.finditer(data, root.end()):
+        start_tag = match.group(1)
+        if start_tag is None:
+            # This is a comment
+            continue
+        element_channel_id = get_channel_id(match.group(2), start_tag)
+        if element_channel_id is None:
+            continue
+        span = (match.start(), match.start() + len(match.group().rstrip()))
+        try:
+            shard = channel_shards[element_channel_id]
+        except KeyError:
+            shard = channel_shards[element_channel_id] = Shard()
+        shard.spans.append(span)
+        for provider_shard in channel_providers.get(element_channel_id, ()):
+            provider_shard.spans.append(span)
+
+    return header, channel_shards, provider_shards
+
+
+def describe(pieces: typing.Iterable[Buffer]) -> dict[str, int | str]:
+    """Get the manifest entry of a file, from its content."""
+    size = 0
+    digest = hashlib.sha256()
+    for piece in pieces:
+        size += len(piece)
+        digest.update(piece)
+    return {"size": size, "sha256": digest.hexdigest()}
+
+
+def write_if_changed(
+    file_path: pathlib.Path,
+    pieces: typing.Callable[[], typing.Iterable[Buffer]],
+) -> tuple[bool, dict[str, int | str]]:
+    """
+    Atomically write a file, unless it already has the given content.
+
+    Unchanged files are left untouched, keeping their modification time. The
+    content is streamed twice, to compare it with the file and to write it,
+    so that it is never held in memory as a whole.
+
+    Parameters
+    ----------
+    file_path: Path
+        The path to the file.
+    pieces: Callable
+        Returns the pieces of the new content, each time it is called.
+
+    Returns
+    -------
+    tuple[bool, dict]
+        Whether the file was written, and its manifest entry.
+    """
+    description = describe(pieces())
+    try:
+        with read_mapped(file_path) as current:
+            if (
+                len(current) == description["size"]
+                and describe([current]) == description
+            ):
+                return False, description
+    except FileNotFoundError:
+        pass
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with write_atomic(file_path) as output:
+        output.writelines(pieces())
+    return True, description
+
+
+def remove_stale_shards(output: pathlib.Path, paths: set[str]) -> None:
+    """
+    Remove the shards of the previous manifest which were not written again.
+
+    Parameters
+    ----------
+    output: Path
+        The output directory.
+    paths: set
+        The paths of the files written this time, relative to `output`.
+    """
+    try:
+        previous = json.loads((output / MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        previous = {}
+    for key in ("channels", "providers"):
+        directory = (output / key).resolve()
+        for entry in previous.get(key, {}).values():
+            path = entry.get("path")
+            if not path or path in paths:
+                continue
+            file_path = (output / path).resolve()
+            if directory not in file_path.parents:
+                msg = f"Not removing {path}, which is not a shard of {output}"
+                logging.warning(msg)
+                continue
+            file_path.unlink(missing_ok=True)
+
+
+def main(
+    data: Buffer,
+    output: pathlib.Path,
+    providers: dict[str, set[str]],
+) -> tuple[int, int]:
+    """
+    Write the combined guide, its shards and their manifest.
+
+    Each file is written as soon as it is rendered, and the combined guide is
+    copied straight from `data`.
+
+    Parameters
+    ----------
+    data: Buffer
+        The encoded XMLTV guide.
+    output: Path
+        The output directory.
+    providers: dict
+        The channel IDs of each provider.
+
+    Returns
+    -------
+    tuple[int, int]
+        The number of files written, and the number of files left unchanged.
+    """
+    header, channel_shards, provider_shards = split_guide(data, providers)
+
+    changed, description = write_if_changed(output / GUIDE, lambda: [data])
+    written = int(changed)
+    paths = {GUIDE}
+    guide = {"path": GUIDE, **description}
+    sections: dict[str, dict[str, dict[str, int | str]]] = {
+        "channels": {},
+        "providers": {},
+    }
+    for key, shards in (("channels", channel_shards), ("providers", provider_shards)):
+        for name, shard in sorted(shards.items()):
+            path = get_shard_path(key, name)
+            changed, description = write_if_changed(
+                output / path,
+                functools.partial(shard.iter_pieces, data, header),
+            )
+            written += changed
+            paths.add(path)
+            sections[key][name] = {"path": path, **description}
+
+    # Remove the shards of the channels which disappeared from the guide
+    remove_stale_shards(output, paths)
+
+    manifest = {"guide": guide, **sections}
+    encoded = json.dumps(manifest, ensure_ascii=False, indent=4).encode()
+    changed, _ = write_if_changed(output / MANIFEST, lambda: [encoded])
+    written += changed
+    return written, len(paths) + 1 - written
+
+
+def entry(argv: list[str] | None = None) -> None:
+    """Entrypoint for the script."""
+    parser = argparse.ArgumentParser(
+        prog="shard",
+        description="Split the guide into a guide per channel and per provider",
+    )
+    parser.add_argument("--input", "-i", type=pathlib.Path, help="Input file")
+    parser.add_argument(
+        "--provider",
+        "-p",
+        type=pathlib.Path,
+        help=(
+            "The channels file of a provider, named like "
+            "`japanterebi@<provider>.channels.xml`"
+        ),
+        nargs="+",
+        action="extend",
+        default=[],
+    )
+    parser.add_argument("output", type=pathlib.Path, help="Output directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    providers = {
+        get_provider_name(file_path): load_allowed(file_path)
+        for file_path in args.provider
+    }
+    with read_mapped(args.input) as data:
+        written, unchanged = main(data, args.output, providers)
+
+    msg = f"Wrote {written} files to {args.output} ({unchanged} unchanged)"
+    logging.info(msg)
+
+
+if __name__ == "__main__":
+    entry()
@@ -0,0 +1,432 @@
+"""Keeps the partial guides in memory and rebuilds the guide when they change."""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import gc
+import html
+import logging
+import pathlib
+import time
+import typing
+
+from japanterebi_xmltv.backends import get_backend
+from japanterebi_xmltv.buffers import write_atomic
+from japanterebi_xmltv.scripts.fix import fix_bytes
+from japanterebi_xmltv.scripts.merger import merge_programs
+from japanterebi_xmltv.scripts.restrict import load_allowed, restrict_bytes
+
+if typing.TYPE_CHECKING:
+    from japanterebi_xmltv.backends import Backend
+
+
+@dataclasses.dataclass
+class PartialGuide:
+    """A parsed and indexed partial guide."""
+
+    path: pathlib.Path
+    signature: tuple[int, int]
+    """The modification time and size of the file when it was parsed"""
+    attributes: list[tuple[str, str]]
+    """The attributes of the root `tv` element"""
+    channels: list[str]
+    """The serialized `channel` elements"""
+    programmes: list[tuple[str | None, str, object]]
+    """The `programme` elements with their merge key and channel, in document order"""
+
+    @property
+    def channel_ids(self) -> set[str]:
+        """The channels which have programmes in this guide."""
+        return {channel for _, channel, _ in self.programmes}
+
+
+def get_signature(file_path: pathlib.Path) -> tuple[int, int] | None:
+    """
+    Get the modification time and size of a file.
+
+    Parameters
+    ----------
+    file_path: Path
+        The path to the file.
+
+    Returns
+    -------
+    tuple[int, int] | None
+        The signature, or None if the file doesn't exist.
+    """
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_key(program: object, backend: Backend[object]) -> str | None:
+    """
+    Get the key used by the merger to find duplicate programs.
+
+    Parameters
+    ----------
+    program: Element
+        The `programme` element.
+    backend: Backend
+        The XML backend the element comes from.
+
+    Returns
+    -------
+    str | None
+        The key, or None if the program is missing its start time or channel.
+    """
+    start_time = backend.get(program, "start")
+    channel = backend.get(program, "channel")
+    if not start_time or not channel:
+        return None
+    return f"{channel}:{start_time}"
+
+
+def parse_partial(
+    file_path: pathlib.Path,
+    backend: Backend[object],
+    allowed: set[str] | None = None,
+) -> PartialGuide:
+    """
+    Parse and index a partial guide.
+
+    Parameters
+    ----------
+    file_path: Path
+        The path to the partial guide.
+    backend: Backend
+        The XML backend used to parse it.
+    allowed: set | None
+        The channel IDs to keep, if the other channels should be dropped.
+
+    Returns
+    -------
+    PartialGuide
+        The parsed guide.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a valid XMLTV file.
+    """
+    signature = get_signature(file_path)
+    if signature is None:
+        msg = f"Input file not found: {file_path}"
+        raise FileNotFoundError(msg)
+
+    data = file_path.read_bytes()
+    if allowed is not None:
+        data = b"".join(restrict_bytes(data, allowed))
+    try:
+        root = backend.parse_bytes(b"".join(fix_bytes(data)))
+    except ValueError as e:
+        msg = f"Couldn't parse {file_path}: {e}"
+        raise ValueError(msg) from e
+
+    if backend.tag(root) != "tv":
+        msg = f"Not a valid XMLTV file: {file_path}"
+        raise ValueError(msg)
+
+    return PartialGuide(
+        path=file_path,
+        signature=signature,
+        attributes=backend.attributes(root),
+        channels=[
+            backend.tostring(channel) for channel in backend.children(root, "channel")
+        ],
+        programmes=[
+            (get_key(program, backend), backend.get(program, "channel"), program)
+            for program in backend.children(root, "programme")
+        ],
+    )
+
+
+class Watcher:
+    """Keeps the partial guides and their merged programs in memory."""
+
+    def __init__(
+        self,
+        partials: list[pathlib.Path],
+        backend: Backend[object] | None = None,
+        allowed: set[str] | None = None,
+    ) -> None:
+        """
+        Initialize the watcher.
+
+        Parameters
+        ----------
+        partials: list
+            The partial guides, in the order they are concatenated.
+        backend: Backend | None
+            The XML backend used to parse the partial guides.
+        allowed: set | None
+            The channel IDs to keep, if the other channels should be dropped.
+        """
+        super().__init__()
+        self.partials = partials
+        self.backend = backend or get_backend()
+        self.allowed = allowed
+        self.guides: dict[pathlib.Path, PartialGuide] = {}
+        self.merged: dict[str, str] = {}
+        """The serialized merged program for each merge key"""
+        self.failed: dict[pathlib.Path, tuple[int, int] | None] = {}
+        """The signature of the partial guides which couldn't be parsed"""
+
+    def poll(self) -> list[pathlib.Path]:
+        """
+        Get the partial guides which changed since they were last parsed.
+
+        Returns
+        -------
+        list
+            The paths to the changed (or removed) partial guides.
+        """
+        changed: list[pathlib.Path] = []
+        for file_path in self.partials:
+            guide = self.guides.get(file_path)
+            signature = get_signature(file_path)
+            if signature == (guide.signature if guide else None):
+                continue
+            if file_path in self.failed and self.failed[file_path] == signature:
+                continue
+            changed.append(file_path)
+        return changed
+
+    def update(self, changed: list[pathlib.Path]) -> set[str]:
+        """
+        Reparse the changed partial guides and re-merge their channels.
+
+        Partial guides which can't be parsed (for example because they are
+        still being written) are kept as they were and retried on the next
+        poll.
+
+        Parameters
+        ----------
+        changed: list
+            The paths to the changed partial guides.
+
+        Returns
+        -------
+        set
+            The channels which were re-merged.
+        """
+        affected: set[str] = set()
+        for file_path in changed:
+            previous = self.guides.pop(file_path, None)
+            if previous:
+                affected |= previous.channel_ids
+            if not file_path.exists():
+                msg = f"Partial guide removed: {file_path}"
+                logging.info(msg)
+                continue
+            try:
+                guide = parse_partial(file_path, self.backend, self.allowed)
+            except (OSError, ValueError) as e:
+                logging.warning(str(e))
+                self.failed[file_path] = get_signature(file_path)
+                if previous:
+                    self.guides[file_path] = previous
+                continue
+            self.failed.pop(file_path, None)
+            self.guides[file_path] = guide
+            affected |= guide.channel_ids
+
+        self.merge(affected)
+        return affected
+
+    def merge(self, channels: set[str]) -> None:
+        """
+        Merge the duplicate programs of the given channels.
+
+        Parameters
+        ----------
+        channels: set
+            The channels to re-merge.
+        """
+        groups: dict[str, list[object]] = {}
+        for guide in self.iter_guides():
+            for key, channel, program in guide.programmes:
+                if key is None or channel not in channels:
+                    continue
+                try:
+                    groups[key].append(program)
+                except KeyError:
+                    groups[key] = [program]
+
+        for key in [key for key in self.merged if key.rpartition(":")[0] in channels]:
+            del self.merged[key]
+
+        for key, programs in groups.items():
+            merged = (
+                programs[0]
+                if len(programs) == 1
+                else merge_programs(programs, self.backend)
+            )
+            self.merged[key] = self.backend.tostring(merged)
+
+    def iter_guides(self) -> typing.Iterable[PartialGuide]:
+        """Iterate over the parsed partial guides, in order."""
+        for file_path in self.partials:
+            guide = self.guides.get(file_path)
+            if guide:
+                yield guide
+
+    def write(self, output: pathlib.Path) -> int:
+        """
+        Atomically write the merged guide.
+
+        Parameters
+        ----------
+        output: Path
+            The path to the guide.
+
+        Returns
+        -------
+        int
+            The number of programs written.
+        """
+        guides = list(self.iter_guides())
+        attributes = "".join(
+            f' {name}="{html.escape(value)}"'
+            for name, value in (guides[0].attributes if guides else [])
+        )
+        seen: set[str] = set()
+        count = 0
+        with write_atomic(output) as file:
+            file.write(
+                f'<?xml version="1.0" encoding="UTF-8"?>\n<tv{attributes}>\n'.encode(),
+            )
+            for guide in guides:
+                for channel in guide.channels:
+                    file.write(f"{channel}\n".encode())
+                for key, _, program in guide.programmes:
+                    if key is None:
+                        serialized = self.backend.tostring(program)
+                    elif key in seen:
+                        continue
+                    else:
+                        seen.add(key)
+                        serialized = self.merged[key]
+                    file.write(f"{serialized}\n".encode())
+                    count += 1
+            file.write(b"</tv>")
+        return count
+
+
+def main(
+    partials: list[pathlib.Path],
+    output: pathlib.Path,
+    *,
+    interval: float = 0.2,
+    once: bool = False,
+    allowed: set[str] | None = None,
+) -> None:
+    """
+    Watch the partial guides and rebuild the guide when they change.
+
+    Parameters
+    ----------
+    partials: list
+        The partial guides, in the order they are concatenated.
+    output: Path
+        The path to the merged guide.
+    interval: float, default = 0.2
+        The number of seconds between each poll.
+    once: bool, default = False
+        Whether to build the guide once and return instead of watching.
+    allowed: set | None
+        The channel IDs to keep, if the other channels should be dropped.
+    """
+    watcher = Watcher(partials, allowed=allowed)
+    while True:
+        changed = watcher.poll()
+        if changed:
+            start = time.perf_counter()
+            # The cyclic garbage collector would otherwise keep traversing the
+            # documents kept in memory while the new ones are being built
+            gc.disable()
+            try:
+                channels = watcher.update(changed)
+                count = watcher.write(output)
+            finally:
+                gc.enable()
+            msg = (
+                f"Rebuilt {output} from {len(changed)} changed partial guide(s) "
+                f"({len(channels)} channels re-merged, {count} programs) "
+                f"in {time.perf_counter() - start:.3f}s"
+            )
+            logging.info(msg)
+            # Free the replaced documents once the guide is published
+            gc.collect()
+        if once:
+            return
+        time.sleep(interval)
+
+
+def entry(argv: list[str] | None = None) -> None:
+    """Entrypoint for the script."""
+    parser = argparse.ArgumentParser(
+        prog="watch",
+        description="Rebuild the guide whenever a partial guide changes",
+    )
+    parser.add_argument(
+        "--input",
+        "-i",
+        type=pathlib.Path,
+        help="Partial guide, in the order they are concatenated",
+        nargs="+",
+        action="extend",
+        required=True,
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.2,
+        help="Number of seconds between each check of the partial guides",
+    )
+    parser.add_argument(
+        "--channels",
+        "-c",
+        type=pathlib.Path,
+        help=(
+            "Only keep the channels (and their programs) of this channels file "
+            "written by `fetcher`, or of this `filter` output"
+        ),
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Build the guide once and exit",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        help="Enable verbose logging",
+        action="store_true",
+    )
+    parser.add_argument("output", type=pathlib.Path, help="Output file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    try:
+        main(
+            args.input,
+            args.output,
+            interval=args.interval,
+            once=args.once,
+            allowed=load_allowed(args.channels) if args.channels else None,
+        )
+    except KeyboardInterrupt:
+        logging.info("Stopped watching")
+
+
+if __name__ == "__main__":
+    entry()
@@ -0,0 +1,126 @@
+"""
+Benchmark the bytes-level engine against the str path.
+
+Usage: python maintenance/benchmarks/bytes_engine.py [--runs N] [--input FILE]
+
+Each step (`concatenate`, `fix` and `minify`) is run in a fresh interpreter,
+once by decoding the document to `str` like the scripts used to, and once
+with the memory-mapped bytes engine. The CPU time and the peak resident
+memory of each run are reported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+PARTIALS = sorted((ROOT / "partial").glob("guide@*.xml"))
+STEPS = ["concatenate", "fix", "minify"]
+
+
+def run_str(step: str, inputs: list[pathlib.Path], output: pathlib.Path) -> None:
+    """Run a step by decoding the documents."""
+    from japanterebi_xmltv.scripts import concatenate, fix, minify  # noqa: PLC0415
+
+    if step == "concatenate":
+        output.write_text("".join(concatenate.concatenate(inputs)))
+        return
+    data = inputs[0].read_text()
+    if step == "fix":
+        output.write_text(fix.fix(data))
+    else:
+        output.write_text("\n".join(minify.minify(data)))
+
+
+def run_bytes(step: str, inputs: list[pathlib.Path], output: pathlib.Path) -> None:
+    """Run a step with the bytes engine."""
+    from japanterebi_xmltv.cli import get_entry  # noqa: PLC0415
+
+    arguments = [str(output)]
+    for file in inputs if step == "concatenate" else inputs[:1]:
+        arguments.extend(["--input", str(file)])
+    get_entry(step)(arguments)
+
+
+def child(engine: str, step: str, inputs: list[pathlib.Path], output: str) -> None:
+    """Run a single measurement and print the CPU time and peak memory."""
+    start = time.process_time()
+    runner = run_str if engine == "str" else run_bytes
+    runner(step, inputs, pathlib.Path(output))
+    elapsed = time.process_time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {peak}")  # noqa: T201
+
+
+def measure(
+    engine: str,
+    step: str,
+    inputs: list[pathlib.Path],
+    output: pathlib.Path,
+    runs: int,
+) -> tuple[float, int]:
+    """Return the best CPU time (s) and peak memory (KiB) of a step."""
+    best_time = float("inf")
+    best_peak = sys.maxsize
+    for _ in range(runs):
+        process = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                engine,
+                step,
+                str(output),
+                *map(str, inputs),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+        )
+        elapsed, peak = process.stdout.split()
+        best_time = min(best_time, float(elapsed))
+        best_peak = min(best_peak, int(peak))
+    return best_time, best_peak
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs")
+    parser.add_argument(
+        "--input",
+        type=pathlib.Path,
+        default=ROOT / "partial" / "guide@jcom.xml",
+        help="The guide used by the `fix` and `minify` steps",
+    )
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        engine, step, output, *inputs = args.child
+        child(engine, step, [pathlib.Path(file) for file in inputs], output)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = pathlib.Path(directory) / "guide.xml"
+        print(f"{'step':<12} {'engine':<6} {'cpu':>9} {'peak rss':>10}")  # noqa: T201
+        for step in STEPS:
+            inputs = PARTIALS if step == "concatenate" else [args.input]
+            for engine in ("str", "bytes"):
+                elapsed, peak = measure(engine, step, inputs, output, args.runs)
+                print(  # noqa: T201
+                    f"{step:<12} {engine:<6} {elapsed * 1000:7.1f}ms "
+                    f"{peak / 1024:7.1f}MiB",
+                )
+
+
+if __name__ == "__main__":
+    main()
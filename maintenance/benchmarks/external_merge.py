@@ -0,0 +1,127 @@
+"""
+Benchmark the external-memory merge mode against the in-memory merger.
+
+Usage: python maintenance/benchmarks/external_merge.py [--copies N ...]
+
+A bigger guide is built by repeating the channels and programs of the
+partial guides under new channel IDs, then it is merged in a fresh
+interpreter, once in memory and once for each memory budget. The CPU time
+and the peak resident memory of each run are reported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pathlib
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+PARTIALS = sorted((ROOT / "partial").glob("guide@*.xml"))
+CHANNEL_REGEX = re.compile(rb'( (?:id|channel)=")([^"]*)(")')
+
+
+def build_guide(output: pathlib.Path, copies: int) -> None:
+    """Concatenate and fix the partial guides, repeated `copies` times."""
+    subprocess.run(
+        [sys.executable, "-m", "japanterebi_xmltv", "batch", "-"],
+        input=(
+            f"concatenate {output} "
+            + " ".join(f"--input {file}" for file in PARTIALS)
+            + f"\nfix --input {output} {output}\n"
+        ),
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    data = output.read_bytes()
+    start = data.index(b"\n", data.index(b"<tv")) + 1
+    end = data.rindex(b"</tv>")
+    with output.open("wb") as file:
+        file.write(data[:start])
+        for copy in range(copies):
+            file.write(
+                CHANNEL_REGEX.sub(
+                    rb"\g<1>\g<2>-%d\g<3>" % copy,
+                    data[start:end],
+                ),
+            )
+        file.write(data[end:])
+
+
+def child(budget: str, guide: str, output: str) -> None:
+    """Run a single measurement and print the CPU time and peak memory."""
+    from japanterebi_xmltv.cli import get_entry  # noqa: PLC0415
+
+    arguments = ["--no-progress", "--input", guide, output]
+    if budget != "memory":
+        arguments.extend(["--memory-budget", budget])
+    start = time.process_time()
+    get_entry("merger")(arguments)
+    elapsed = time.process_time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {peak}")  # noqa: T201
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--copies",
+        type=int,
+        nargs="+",
+        default=[1, 10],
+        help="Number of times the partial guides are repeated",
+    )
+    parser.add_argument(
+        "--budget",
+        nargs="+",
+        default=["4", "16"],
+        help="Memory budgets, in MiB",
+    )
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        guide = pathlib.Path(directory) / "guide.xml"
+        output = pathlib.Path(directory) / "merged.xml"
+        print(  # noqa: T201
+            f"{'copies':>6} {'size':>9} {'mode':<12} {'cpu':>9} {'peak rss':>10}",
+        )
+        for copies in args.copies:
+            build_guide(guide, copies)
+            size = guide.stat().st_size
+            for budget in ["memory", *args.budget]:
+                process = subprocess.run(  # noqa: S603
+                    [
+                        sys.executable,
+                        __file__,
+                        "--child",
+                        budget,
+                        str(guide),
+                        str(output),
+                    ],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    env={**os.environ, "PYTHONPATH": str(ROOT)},
+                )
+                elapsed, peak = process.stdout.split()
+                mode = "in memory" if budget == "memory" else f"{budget}MiB budget"
+                print(  # noqa: T201
+                    f"{copies:>6} {size / (1 << 20):7.1f}MiB {mode:<12} "
+                    f"{float(elapsed):8.2f}s {int(peak) / 1024:7.1f}MiB",
+                )
+
+
+if __name__ == "__main__":
+    main()
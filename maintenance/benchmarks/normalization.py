@@ -0,0 +1,104 @@
+"""
+Benchmark the text normalizations used to find the duplicate child elements.
+
+Usage: python maintenance/benchmarks/normalization.py [--runs N] [--backend NAME]
+
+The partial guides are concatenated and fixed like in the update workflow,
+then the duplicate programs are merged with each normalization, with and
+without its cache. The CPU time of the merge, the size of the merged guide
+and the cache statistics are reported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+PARTIALS = sorted((ROOT / "partial").glob("guide@*.xml"))
+sys.path.insert(0, str(ROOT))
+
+
+def measure(
+    guide: pathlib.Path,
+    backend_name: str,
+    preset: str,
+    cache_size: int | None,
+    runs: int,
+) -> tuple[float, int, str]:
+    """Return the best CPU time of the merge, the output size and cache info."""
+    from japanterebi_xmltv.backends import get_backend  # noqa: PLC0415
+    from japanterebi_xmltv.normalization import PRESETS, Normalizer  # noqa: PLC0415
+    from japanterebi_xmltv.scripts.merger import main as merge  # noqa: PLC0415
+
+    backend = get_backend(backend_name)
+    best = float("inf")
+    size = 0
+    cache = "-"
+    for _ in range(runs):
+        root = backend.parse(guide)
+        normalizer = Normalizer(PRESETS[preset], cache_size=cache_size)
+        gc.collect()
+        start = time.process_time()
+        merge(root, backend, normalizer=normalizer)
+        best = min(best, time.process_time() - start)
+        size = len(backend.serialize(root))
+        cache_info = getattr(normalizer.normalize, "cache_info", None)
+        if cache_info:
+            info = cache_info()
+            cache = f"{info.hits} hits / {info.misses} misses"
+    return best, size, cache
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs")
+    parser.add_argument("--backend", default="etree", help="The XML backend")
+    args = parser.parse_args()
+
+    from japanterebi_xmltv.normalization import (  # noqa: PLC0415
+        DEFAULT_CACHE_SIZE,
+        PRESETS,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        guide = pathlib.Path(directory) / "guide.xml"
+        subprocess.run(
+            [sys.executable, "-m", "japanterebi_xmltv", "batch", "-"],
+            input=(
+                f"concatenate {guide} "
+                + " ".join(f"--input {file}" for file in PARTIALS)
+                + f"\nfix --input {guide} {guide}\n"
+            ),
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+        )
+
+        print(  # noqa: T201
+            f"{'preset':<10} {'cache':<8} {'merge cpu':>10} {'size':>10}  cache",
+        )
+        for preset in PRESETS:
+            for cache_size in (0, DEFAULT_CACHE_SIZE):
+                elapsed, size, cache = measure(
+                    guide,
+                    args.backend,
+                    preset,
+                    cache_size,
+                    args.runs,
+                )
+                print(  # noqa: T201
+                    f"{preset:<10} {'on' if cache_size else 'off':<8} "
+                    f"{elapsed * 1000:8.1f}ms {size:>10}  {cache}",
+                )
+
+
+if __name__ == "__main__":
+    main()
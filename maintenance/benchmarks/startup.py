@@ -0,0 +1,123 @@
+"""
+Benchmark the interpreter startup of the scripts against the unified CLI.
+
+Usage: python maintenance/benchmarks/startup.py [--runs N]
+
+Two things are measured:
+
+- the `-X importtime` summary (total import time and heaviest modules) of
+  each script module compared to `japanterebi_xmltv.cli`
+- the wall time of running `fetcher` six times, once with one interpreter
+  per invocation (like the workflow does) and once through `japanterebi batch`
+"""
+
+from __future__ import annotations
+
+import argparse
+import pathlib
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+SCRIPTS = ["fetcher", "filter", "fix", "merger", "minify", "concatenate"]
+
+
+def importtime(module: str) -> tuple[int, list[tuple[int, str]]]:
+    """Return the total import time (us) and the heaviest imports of a module."""
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    )
+    total = 0
+    top_level: list[tuple[int, str]] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line.removeprefix("import time:").split("|")
+        total += int(self_time)
+        # Top level imports are not indented
+        if not name.startswith("  "):
+            top_level.append((int(cumulative), name.strip()))
+    return total, sorted(top_level, reverse=True)[:3]
+
+
+def execute(*commands: list[str]) -> None:
+    """Run the given commands one after the other."""
+    for command in commands:
+        subprocess.run(command, check=True, cwd=ROOT, capture_output=True)  # noqa: S603
+
+
+def best_of(runs: int, *commands: list[str]) -> float:
+    """Return the best wall time of running the commands over several runs."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        execute(*commands)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs")
+    args = parser.parse_args()
+
+    print("-X importtime summary (total self time, heaviest top-level imports)")  # noqa: T201
+    for module in [
+        *(f"japanterebi_xmltv.scripts.{script}" for script in SCRIPTS),
+        "japanterebi_xmltv.cli",
+    ]:
+        total, heaviest = importtime(module)
+        details = ", ".join(
+            f"{name} {cumulative / 1000:.1f}ms" for cumulative, name in heaviest
+        )
+        print(f"  {module:<40} {total / 1000:7.1f}ms  ({details})")  # noqa: T201
+
+    with tempfile.TemporaryDirectory() as directory:
+        site = pathlib.Path(directory) / "site"
+        site.mkdir()
+        (site / "site.config.js").touch()
+        for channels in (ROOT / "partial").glob("*.channels.xml"):
+            shutil.copy(channels, site / channels.name)
+        invocations = [
+            [
+                "fetcher",
+                "--input",
+                "channels.json",
+                "--sites",
+                str(site),
+                str(pathlib.Path(directory) / f"out{index}.xml"),
+            ]
+            for index in range(6)
+        ]
+        best_separate = best_of(
+            args.runs,
+            *(
+                [sys.executable, "-m", f"japanterebi_xmltv.scripts.{command}", *rest]
+                for command, *rest in invocations
+            ),
+        )
+
+        batch_file = pathlib.Path(directory) / "batch.txt"
+        batch_file.write_text(
+            "\n".join(shlex.join(invocation) for invocation in invocations)
+        )
+        best_batch = best_of(
+            args.runs,
+            [sys.executable, "-m", "japanterebi_xmltv", "batch", str(batch_file)],
+        )
+
+    print(f"6 x fetcher, one interpreter each: {best_separate * 1000:7.1f}ms")  # noqa: T201
+    print(f"6 x fetcher, japanterebi batch:    {best_batch * 1000:7.1f}ms")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
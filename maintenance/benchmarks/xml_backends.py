@@ -0,0 +1,131 @@
+"""
+Benchmark the XML backends of the merger.
+
+Usage: python maintenance/benchmarks/xml_backends.py [--runs N]
+
+The partial guides are concatenated and fixed like in the update workflow,
+then each backend parses, merges and serializes the guide in a fresh
+interpreter. The CPU time of each phase and the peak resident memory are
+reported, and the output of every backend is compared to the `minidom` one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+PARTIALS = sorted((ROOT / "partial").glob("guide@*.xml"))
+BACKENDS = ["minidom", "etree", "lxml"]
+PHASES = ["parse", "merge", "serialize"]
+
+
+def child(name: str, guide: pathlib.Path, output: pathlib.Path) -> None:
+    """Run a single measurement and print the timings, peak memory and hash."""
+    from japanterebi_xmltv.backends import get_backend  # noqa: PLC0415
+    from japanterebi_xmltv.scripts.merger import main  # noqa: PLC0415
+
+    backend = get_backend(name)
+    timings: list[float] = []
+
+    start = time.process_time()
+    root = backend.parse(guide)
+    timings.append(time.process_time() - start)
+
+    start = time.process_time()
+    main(root, backend)
+    timings.append(time.process_time() - start)
+
+    start = time.process_time()
+    data = backend.serialize(root)
+    timings.append(time.process_time() - start)
+
+    output.write_bytes(data)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    digest = hashlib.sha256(data).hexdigest()
+    print(*timings, peak, digest)  # noqa: T201
+
+
+def measure(
+    name: str,
+    guide: pathlib.Path,
+    output: pathlib.Path,
+    runs: int,
+) -> tuple[list[float], int, str]:
+    """Return the best CPU time (s) of each phase, peak memory (KiB) and hash."""
+    best_timings = [float("inf")] * len(PHASES)
+    best_peak = sys.maxsize
+    digest = ""
+    for _ in range(runs):
+        process = subprocess.run(  # noqa: S603
+            [sys.executable, __file__, "--child", name, str(guide), str(output)],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+        )
+        *timings, peak, digest = process.stdout.split()
+        best_timings = [
+            min(best, float(elapsed)) for best, elapsed in zip(best_timings, timings)
+        ]
+        best_peak = min(best_peak, int(peak))
+    return best_timings, best_peak, digest
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3, help="Number of runs")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        name, guide, output = args.child
+        child(name, pathlib.Path(guide), pathlib.Path(output))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        guide = pathlib.Path(directory) / "guide.xml"
+        output = pathlib.Path(directory) / "merged.xml"
+        subprocess.run(
+            [sys.executable, "-m", "japanterebi_xmltv", "batch", "-"],
+            input=(
+                f"concatenate {guide} "
+                + " ".join(f"--input {file}" for file in PARTIALS)
+                + f"\nfix --input {guide} {guide}\n"
+            ),
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+        )
+
+        print(  # noqa: T201
+            f"{'backend':<8} "
+            + " ".join(f"{phase:>10}" for phase in PHASES)
+            + f" {'total':>10} {'peak rss':>10}  output",
+        )
+        reference = None
+        for name in BACKENDS:
+            try:
+                timings, peak, digest = measure(name, guide, output, args.runs)
+            except subprocess.CalledProcessError as e:
+                print(f"{name:<8} unavailable: {e.stderr.strip()}")  # noqa: T201
+                continue
+            reference = reference or digest
+            print(  # noqa: T201
+                f"{name:<8} "
+                + " ".join(f"{elapsed * 1000:8.1f}ms" for elapsed in timings)
+                + f" {sum(timings) * 1000:8.1f}ms {peak / 1024:7.1f}MiB  "
+                + ("identical" if digest == reference else "DIFFERENT"),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ STEPS=(
     "filter-channels"
     "install-js-deps"
     "fetch-programs"
+    "prune-programs"
     "fix-document"
     "merge-programs"
     "minify-xml"
@@ -169,12 +170,14 @@ should_stop "download-epg"
 
 # Step 6: Filter channels
 echo "🔧 Filtering the channels..."
-uv run fetcher --input channels.json --sites epg/sites japanterebi.channels.xml
-uv run fetcher --input channels.json --sites epg/sites/tvguide.myjcom.jp partial/japanterebi@jcom.channels.xml
-uv run fetcher --input channels.json --sites epg/sites/skyperfectv.co.jp partial/japanterebi@skyperfectv.channels.xml
-uv run fetcher --input channels.json --sites epg/sites/s.mxtv.jp partial/japanterebi@mxtv.channels.xml
-uv run fetcher --input channels.json --sites epg/sites/nhkworldpremium.com partial/japanterebi@nhkworldpremium.channels.xml
-uv run fetcher --input channels.json --sites epg/sites/www3.nhk.or.jp partial/japanterebi@nhk.channels.xml
+uv run japanterebi batch - <<EOF
+fetcher --input channels.json --sites epg/sites japanterebi.channels.xml
+fetcher --input channels.json --sites epg/sites/tvguide.myjcom.jp partial/japanterebi@jcom.channels.xml
+fetcher --input channels.json --sites epg/sites/skyperfectv.co.jp partial/japanterebi@skyperfectv.channels.xml
+fetcher --input channels.json --sites epg/sites/s.mxtv.jp partial/japanterebi@mxtv.channels.xml
+fetcher --input channels.json --sites epg/sites/nhkworldpremium.com partial/japanterebi@nhkworldpremium.channels.xml
+fetcher --input channels.json --sites epg/sites/www3.nhk.or.jp partial/japanterebi@nhk.channels.xml
+EOF
 should_stop "filter-channels"
 
 # Step 7: Install JavaScript dependencies
@@ -194,6 +197,7 @@ NODE_OPTIONS=--max-old-space-size=5000 npm run grab -- --channels=../partial/jap
 NODE_OPTIONS=--max-old-space-size=5000 npm run grab -- --channels=../partial/japanterebi@nhk.channels.xml --maxConnections=10 --output="../partial/guide@nhk.xml"
 cd ..
 uv run concatenate  ./guide.xml \
+                    --channels japanterebi.channels.xml \
                     --input partial/guide@jcom.xml \
                     --input partial/guide@skyperfectv.xml \
                     --input partial/guide@mxtv.xml \
@@ -201,22 +205,27 @@ uv run concatenate  ./guide.xml \
                     --input partial/guide@nhk.xml
 should_stop "fetch-programs"
 
-# Step 9: Fix document
+# Step 9: Prune programs
+echo "✂️  Pruning the expired and far-future programs..."
+uv run prune --input guide.xml guide.xml
+should_stop "prune-programs"
+
+# Step 10: Fix document
 echo "🔧 Fixing the document..."
 uv run fix --input guide.xml guide.xml
 should_stop "fix-document"
 
-# Step 10: Merge redundant programs
+# Step 11: Merge redundant programs
 echo "🔀 Merging redundant programs..."
 uv run merger --input guide.xml guide.xml
 should_stop "merge-programs"
 
-# Step 11: Minify XML
+# Step 12: Minify XML
 echo "📦 Minifying XML..."
 uv run minify --input guide.xml guide.xml
 should_stop "minify-xml"
 
-# Step 12: Commit changes
+# Step 13: Commit changes
 echo "💾 Committing the new data..."
 git config user.name 'Japan Terebi [Local Script]'
 git config user.email 'japanterebi@users.noreply.github.com'
@@ -0,0 +1 @@
+"""Tests for the japanterebi_xmltv package."""
@@ -0,0 +1,53 @@
+"""Tests for the unified command line interface."""
+
+from __future__ import annotations
+
+import io
+import typing
+
+from japanterebi_xmltv.cli import batch
+
+if typing.TYPE_CHECKING:
+    import pathlib
+
+    import pytest
+
+GUIDE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    "<tv>\n"
+    '<channel id="a.jp"><display-name>A</display-name></channel>\n'
+    '<programme start="20250101000000 +0000" stop="20250101010000 +0000" '
+    'channel="a.jp"><title>One</title></programme>\n'
+    "</tv>\n"
+)
+
+
+def run_batch(tmp_path: pathlib.Path, merger_arguments: str) -> None:
+    """Prune a guide to the standard output, then merge it to a file."""
+    guide = tmp_path / "guide.xml"
+    guide.write_text(GUIDE)
+    batch(
+        io.StringIO(
+            f"prune --input {guide} -\n"
+            f"merger --no-progress {merger_arguments} "
+            f"--input {guide} {tmp_path / 'merged.xml'}\n",
+        ),
+    )
+
+
+def test_batch_logging_enabled_again(
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """A step writing to the standard output doesn't silence the next ones."""
+    run_batch(tmp_path, "")
+    assert "Final program count: 1" in capsys.readouterr().err
+
+
+def test_batch_logging_configured_again(
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Each step configures the logging level it asks for."""
+    run_batch(tmp_path, "--verbose")
+    assert "DEBUG - Using the" in capsys.readouterr().err
@@ -0,0 +1,71 @@
+"""Tests for the external-memory merge mode of the merger."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from japanterebi_xmltv.backends import get_backend
+from japanterebi_xmltv.scripts.merger import iter_elements, merge_external
+from japanterebi_xmltv.scripts.restrict import ELEMENT_REGEX
+
+DOCUMENT = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<tv date="20250101">\n'
+    b'<channel id="a.jp"><display-name>A</display-name></channel>\n'
+    b'<programme start="1" stop="2" channel="a.jp"><!-- c -->'
+    b"<title>One</title></programme>\n"
+    b"<!-- between -->\n"
+    b'<programme start="2" stop="3" channel="a.jp"><title>Two</title>'
+    b"<desc>" + b"x" * 100 + b"</desc></programme>\n"
+    b'<programme start="2" stop="3" channel="a.jp"><title>Two</title>'
+    b"<desc>y</desc></programme>\n"
+    b"</tv>"
+)
+
+
+def elements(chunk_size: int) -> list[bytes]:
+    """Read the elements of the document in chunks."""
+    return [
+        match.group()
+        for match in iter_elements(io.BytesIO(DOCUMENT), chunk_size=chunk_size)
+    ]
+
+
+def test_comment_at_chunk_boundary() -> None:
+    """A chunk ending after a comment inside a program doesn't drop it."""
+    chunk_size = DOCUMENT.index(b"-->") + 5
+    assert elements(chunk_size) == elements(len(DOCUMENT))
+    assert elements(chunk_size)[1].startswith(b'<programme start="1"')
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 64))
+def test_chunk_sizes(chunk_size: int) -> None:
+    """The elements don't depend on how the document is read."""
+    expected = [match.group() for match in ELEMENT_REGEX.finditer(DOCUMENT)]
+    assert elements(chunk_size) == expected
+
+
+def test_first_element_string() -> None:
+    """The text before the first element is kept in its match."""
+    match = next(iter_elements(io.BytesIO(DOCUMENT), chunk_size=7))
+    assert match.string[: match.start()].endswith(b'<tv date="20250101">\n')
+
+
+@pytest.mark.parametrize("budget", [0, 1 << 10, 1 << 20])
+def test_merge_external(budget: int) -> None:
+    """The duplicate programs are merged whatever the memory budget."""
+    output = io.BytesIO()
+    count, merged = merge_external(
+        io.BytesIO(DOCUMENT),
+        output,
+        get_backend("etree"),
+        budget=budget,
+    )
+    assert (count, merged) == (3, 1)
+    assert output.getvalue().count(b"<programme") == 2  # noqa: PLR2004
+    # The children of both programs are kept, without the duplicate title
+    assert output.getvalue().count(b"<title>Two</title>") == 1
+    assert b"<desc>" + b"x" * 100 + b"</desc>" in output.getvalue()
+    assert b"<desc>y</desc>" in output.getvalue()